@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def synchronous_thumbnails(settings):
+    """Миниатюры строятся синхронно, как под core.runner.TestRunner."""
+    settings.THUMBNAIL_WORKERS = 0
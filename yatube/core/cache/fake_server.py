@@ -0,0 +1,188 @@
+"""
+Минимальный сервер с протоколом Redis для разработки и тестов.
+
+Хранит данные в памяти процесса и поддерживает только команды,
+которые использует core.cache.redis.RedisCache. Запуск:
+
+    python -m core.cache.fake_server --port 6379
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def command(self, name, args):
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return Error(f'ERR unknown command {name!r}')
+        with self.lock:
+            return handler(*args)
+
+    def cmd_ping(self, *args):
+        return Simple('PONG')
+
+    def cmd_select(self, db):
+        return Simple('OK')
+
+    def cmd_get(self, key):
+        item = self._alive(key)
+        return None if item is None else item[0]
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'PX' in options:
+            ttl = int(options[options.index(b'PX') + 1]) / 1000
+            expires = time.monotonic() + ttl
+        elif b'EX' in options:
+            expires = time.monotonic() + int(options[options.index(b'EX') + 1])
+        exists = self._alive(key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self.data[key] = (value, expires)
+        return Simple('OK')
+
+    def cmd_del(self, *keys):
+        return sum(
+            self.data.pop(key, None) is not None
+            for key in keys
+            if self._alive(key) is not None
+        )
+
+    def cmd_exists(self, *keys):
+        return sum(self._alive(key) is not None for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        item = self._alive(key)
+        value, expires = item if item is not None else (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            return Error('ERR value is not an integer or out of range')
+        self.data[key] = (b'%d' % value, expires)
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, b'1')
+
+    def cmd_pexpire(self, key, ttl):
+        item = self._alive(key)
+        if item is None:
+            return 0
+        self.data[key] = (item[0], time.monotonic() + int(ttl) / 1000)
+        return 1
+
+    def cmd_expire(self, key, ttl):
+        return self.cmd_pexpire(key, int(ttl) * 1000)
+
+    def cmd_persist(self, key):
+        item = self._alive(key)
+        if item is None or item[1] is None:
+            return 0
+        self.data[key] = (item[0], None)
+        return 1
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return Simple('OK')
+
+    cmd_flushall = cmd_flushdb
+
+
+class Simple(str):
+    pass
+
+
+class Error(str):
+    pass
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Error):
+        return b'-%s\r\n' % reply.encode()
+    if isinstance(reply, Simple):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if not args:
+                return
+            name = args[0].decode()
+            if name.upper() == 'QUIT':
+                self.wfile.write(encode(Simple('OK')))
+                return
+            self.wfile.write(encode(self.server.store.command(name, args[1:])))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super().__init__(address, Handler)
+        self.store = Store()
+
+    @property
+    def location(self):
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    options = parser.parse_args()
+    with FakeRedisServer((options.host, options.port)) as server:
+        print(f'Сервер кэша слушает {server.location}')
+        server.serve_forever()
@@ -0,0 +1,268 @@
+"""
+Кэш-бэкенд для серверов с протоколом Redis (RESP).
+
+Реализует только команды, нужные Django-кэшу, и не требует
+сторонних библиотек. Каждый поток держит своё постоянное соединение.
+
+Как и memcached-бэкенды Django, при недоступном сервере кэш не
+выбрасывает исключений: чтение считается промахом, а неудачная запись
+или удаление пишутся в лог.
+"""
+import logging
+import pickle
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_PORT = 6379
+
+logger = logging.getLogger(__name__)
+
+# Результат команды, которую не удалось выполнить из-за сети.
+FAILED = object()
+
+
+class RedisError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = b'%d' % arg
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Соединение с кэш-сервером закрыто.')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f'Неизвестный ответ сервера: {line!r}')
+
+    def execute(self, *args):
+        self.sock.sendall(self.encode(args))
+        return self.read_reply()
+
+    def pipeline(self, commands):
+        self.sock.sendall(b''.join(self.encode(args) for args in commands))
+        return [self.read_reply() for _ in commands]
+
+
+class RedisCache(BaseCache):
+    """
+    LOCATION: 'host:port' или 'redis://host:port/db'.
+    OPTIONS: SOCKET_TIMEOUT — таймаут сокета в секундах;
+    RETRY_AFTER — сколько секунд после сбоя не подключаться к серверу.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        if '://' not in server:
+            server = f'redis://{server}'
+        url = urlparse(server)
+        self._host = url.hostname or 'localhost'
+        self._port = url.port or DEFAULT_PORT
+        self._db = int(url.path.strip('/') or 0)
+        options = params.get('OPTIONS', {})
+        self._socket_timeout = options.get('SOCKET_TIMEOUT', 1)
+        self._retry_after = options.get('RETRY_AFTER', 5)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if time.monotonic() < getattr(self._local, 'retry_at', 0):
+                raise ConnectionError('Кэш-сервер недавно был недоступен.')
+            connection = Connection(
+                self._host, self._port, self._db, self._socket_timeout
+            )
+            self._local.connection = connection
+        return connection
+
+    def _reset_connection(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def _call(self, method, *args):
+        """Результат команды или FAILED, если сервер недоступен."""
+        try:
+            try:
+                return getattr(self._connection(), method)(*args)
+            except OSError:
+                # Сервер мог закрыть простаивающее соединение.
+                self._reset_connection()
+                return getattr(self._connection(), method)(*args)
+        except OSError as error:
+            self._reset_connection()
+            if getattr(self._local, 'retry_at', 0) <= time.monotonic():
+                logger.warning(
+                    'Кэш-сервер %s:%s недоступен: %s',
+                    self._host, self._port, error
+                )
+                self._local.retry_at = time.monotonic() + self._retry_after
+            return FAILED
+
+    def _execute(self, *args):
+        return self._call('execute', *args)
+
+    def _pipeline(self, commands):
+        return self._call('pipeline', commands)
+
+    @staticmethod
+    def _dumps(value):
+        # Целые числа хранятся как есть, чтобы работал INCRBY.
+        if isinstance(value, int) and not isinstance(value, bool):
+            return b'%d' % value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data):
+        if data is None:
+            return None
+        if data[:1] == b'\x80':
+            return pickle.loads(data)
+        return int(data)
+
+    def _expiry_args(self, timeout):
+        """Аргументы PX для SET; None — ключ без срока, 'expired' — сразу."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        if timeout <= 0:
+            return None
+        return ('PX', int(timeout * 1000))
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry_args(timeout)
+        if expiry is None:
+            return False
+        reply = self._execute(
+            'SET', self._key(key, version), self._dumps(value), *expiry, 'NX'
+        )
+        return reply is not None and reply is not FAILED
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        if data is None or data is FAILED:
+            return default
+        return self._loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry_args(timeout)
+        if expiry is None:
+            self._execute('DEL', key)
+            return
+        self._execute('SET', key, self._dumps(value), *expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry_args(timeout)
+        if expiry is None:
+            reply = self._execute('DEL', key)
+        elif not expiry:
+            reply = self._execute('PERSIST', key)
+            if reply is not FAILED and not reply:
+                reply = self._execute('EXISTS', key)
+        else:
+            reply = self._execute('PEXPIRE', key, expiry[1])
+        return reply is not FAILED and bool(reply)
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._execute(
+            'MGET', *(self._key(key, version) for key in keys)
+        )
+        if values is FAILED:
+            return {}
+        return {
+            key: self._loads(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry_args(timeout)
+        if expiry is None:
+            self.delete_many(data, version=version)
+            return []
+        replies = self._pipeline([
+            ('SET', self._key(key, version), self._dumps(value), *expiry)
+            for key, value in data.items()
+        ])
+        return list(data) if replies is FAILED else []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        reply = self._execute('EXISTS', self._key(key, version))
+        return reply is not FAILED and bool(reply)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        exists = self._execute('EXISTS', key)
+        if exists is FAILED or not exists:
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            value = self._execute('INCRBY', key, delta)
+        except RedisError as error:
+            raise ValueError(str(error))
+        if value is FAILED:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
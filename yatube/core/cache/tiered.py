@@ -0,0 +1,120 @@
+"""
+Двухуровневый кэш: память процесса (L1) поверх общего кэша (L2).
+
+В L1 попадают только ключи с префиксами из L1_KEY_PREFIXES. Это должны
+быть неизменяемые записи, ключ которых меняется вместе с данными
+(например, версионированные фрагменты шаблонов): другой процесс не может
+сбросить чужой L1, поэтому изменяемые значения, вроде счётчиков версий,
+читаются только из L2.
+
+OPTIONS:
+    L2 — псевдоним общего кэша в settings.CACHES;
+    L1_TIMEOUT — время жизни записи в L1 в секундах (0 — L1 отключён);
+    L1_MAX_ENTRIES — максимальное число записей в L1;
+    L1_KEY_PREFIXES — префиксы «горячих» ключей.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core import perf
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1_prefixes = tuple(options.get('L1_KEY_PREFIXES', ()))
+        self.l1 = LocMemCache(f'tiered-{location}', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _is_hot(self, key):
+        return self.l1_timeout and key.startswith(self.l1_prefixes)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.add(key, value, timeout, version)
+
+    def get(self, key, default=None, version=None):
+        value = self._get(key, version)
+        perf.count('cache_miss' if value is None else 'cache_hit')
+        return default if value is None else value
+
+    def _get(self, key, version):
+        if not self._is_hot(key):
+            return self.l2.get(key, version=version)
+        value = self.l1.get(key, version=version)
+        if value is None:
+            value = self.l2.get(key, version=version)
+            if value is not None:
+                self.l1.set(key, value, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        if self._is_hot(key):
+            self.l1.set(key, value, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version)
+        self.l2.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            value = None
+            if self._is_hot(key):
+                value = self.l1.get(key, version=version)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self.l2.get_many(missing, version=version)
+            for key, value in fetched.items():
+                if self._is_hot(key):
+                    self.l1.set(key, value, version=version)
+            found.update(fetched)
+        perf.count('cache_hit', len(found))
+        perf.count('cache_miss', len(keys) - len(found))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version)
+        for key, value in data.items():
+            if self._is_hot(key):
+                self.l1.set(key, value, version=version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l1.delete_many(keys, version)
+        self.l2.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        if self._is_hot(key) and self.l1.has_key(key, version):
+            return True
+        return self.l2.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version)
+        return self.l2.incr(key, delta, version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
@@ -0,0 +1,96 @@
+"""
+Чтение из реплик БД.
+
+Псевдонимы реплик перечислены в настройке DATABASE_REPLICAS. ReplicaRouter
+отправляет на случайную реплику только чтения внутри безопасных
+(GET, HEAD, OPTIONS) HTTP-запросов; всё остальное — записи, POST-запросы,
+транзакции, команды и фоновые потоки — работает с основной БД.
+
+Реплики отстают от основной БД, поэтому после записи пользователь
+читает из основной БД: до конца запроса и ещё REPLICA_PIN_SECONDS секунд
+по cookie, которую ставит ReplicaMiddleware. Отставание реплик должно
+быть меньше этого окна.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+class ReadState:
+    """Состояние маршрутизации одного HTTP-запроса."""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+@contextmanager
+def request_scope(use_replicas):
+    """Маршрутизация запросов к БД внутри блока как в HTTP-запросе."""
+    state = ReadState(use_replicas)
+    _local.state = state
+    try:
+        yield state
+    finally:
+        _local.state = None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = getattr(_local, 'state', None)
+        if (
+            state is None
+            or not state.use_replicas
+            or state.wrote
+            or not settings.DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = getattr(_local, 'state', None)
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же данные, что и в основной БД.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """
+    Разрешает чтение из реплик в безопасных запросах и закрепляет
+    пользователя за основной БД после записи.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replicas = (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        with request_scope(use_replicas) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
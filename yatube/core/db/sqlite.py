@@ -0,0 +1,18 @@
+"""
+Настройка соединений SQLite.
+
+Прагмы из настройки SQLITE_PRAGMAS выполняются для каждого нового
+соединения. Запросы идут мимо курсора Django, поэтому не попадают
+в журналы и бюджеты запросов.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, target_name, pages=1024):
+    """
+    Копирует БД SQLite source (соединение Django) в файл target_name
+    через backup API: копия согласована, а основная БД не блокируется
+    на всё время копирования.
+    """
+    source.ensure_connection()
+    target = sqlite3.connect(target_name)
+    try:
+        source.connection.backup(target, pages=pages)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную БД SQLite в файлы реплик из DATABASE_REPLICAS. '
+        'Нужна для локальной проверки чтения из реплик; в продакшене '
+        'реплики обновляет сама СУБД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование каждые столько секунд; 0 — один раз.'
+        )
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_DB_REPLICAS.'
+            )
+        while True:
+            started = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                copy_database(source, connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f'Реплики обновлены: {len(settings.DATABASE_REPLICAS)} '
+                f'за {time.perf_counter() - started:.2f} с.'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
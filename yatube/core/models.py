@@ -5,7 +5,8 @@ class CreatedModel(models.Model):
     """Абстрактная модель. Добавляетс дату создания."""
     created = models.DateTimeField(
         verbose_name='дата создания',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True
     )
 
     class Meta:
@@ -0,0 +1,70 @@
+"""
+Замеры производительности запросов.
+
+PerformanceMiddleware открывает для выбранного запроса набор замеров
+(RequestTimings), а код приложения добавляет в него время и счётчики
+через timed() и count(). Вне замеряемого запроса эти функции сводятся
+к одной проверке threading.local, поэтому при выключенной выборке
+накладные расходы пренебрежимо малы.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Время (в секундах) и счётчики одного запроса."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.depth = defaultdict(int)
+
+
+def current():
+    """Замеры текущего запроса или None, если запрос не замеряется."""
+    return getattr(_local, 'timings', None)
+
+
+def activate(timings):
+    _local.timings = timings
+
+
+def deactivate():
+    _local.timings = None
+
+
+def count(name, value=1):
+    timings = current()
+    if timings is not None:
+        timings.counts[name] += value
+
+
+def add_duration(name, seconds):
+    timings = current()
+    if timings is not None:
+        timings.durations[name] += seconds
+
+
+@contextmanager
+def timed(name):
+    """
+    Добавляет время выполнения блока к замеру name.
+
+    Вложенные блоки с тем же именем не учитываются повторно.
+    """
+    timings = current()
+    if timings is None:
+        yield
+        return
+    timings.depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth[name] -= 1
+        if not timings.depth[name]:
+            timings.durations[name] += time.perf_counter() - started
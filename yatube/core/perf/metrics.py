@@ -0,0 +1,150 @@
+"""
+Агрегированные метрики процесса в текстовом формате Prometheus.
+
+Метрики хранятся в памяти процесса: при нескольких процессах
+сервера каждый из них нужно опрашивать отдельно.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+# Границы корзин по умолчанию, как в клиентских библиотеках Prometheus.
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    7.5, 10.0,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0
+                }
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self):
+        with self._lock:
+            series = {
+                labels: {**data, 'buckets': list(data['buckets'])}
+                for labels, data in self._series.items()
+            }
+        for label_values, data in sorted(series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, data['buckets']):
+                cumulative += hits
+                labels = _format_labels(
+                    self.labels, label_values, [('le', _format_number(bound))]
+                )
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(
+                self.labels, label_values, [('le', '+Inf')]
+            )
+            yield f'{self.name}_bucket{labels} {data["count"]}'
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {_format_number(data["sum"])}'
+            yield f'{self.name}_count{labels} {data["count"]}'
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, value=1, *label_values):
+        with self._lock:
+            self._values[label_values] += value
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_total{labels} {value}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            name = metric.name
+            if metric.type == 'counter':
+                name += '_total'
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса.', labels=('view',)
+))
+DB_DURATION = REGISTRY.register(Histogram(
+    'yatube_db_duration_seconds',
+    'Время запросов к БД за один HTTP-запрос.', labels=('view',)
+))
+DB_QUERIES = REGISTRY.register(Histogram(
+    'yatube_db_queries',
+    'Число запросов к БД за один HTTP-запрос.', labels=('view',),
+    buckets=COUNT_BUCKETS
+))
+TEMPLATE_DURATION = REGISTRY.register(Histogram(
+    'yatube_template_duration_seconds',
+    'Время рендеринга шаблонов за один HTTP-запрос.', labels=('view',)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'yatube_cache_requests',
+    'Обращения к кэшу по результату.', labels=('view', 'result')
+))
+THUMBNAIL_DURATION = REGISTRY.register(Histogram(
+    'yatube_thumbnail_duration_seconds',
+    'Время построения миниатюр одного поста.'
+))
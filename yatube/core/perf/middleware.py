@@ -0,0 +1,89 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import RequestTimings, activate, deactivate, metrics
+
+
+class QueryTimer:
+    """execute_wrapper, суммирующий время и число запросов к БД."""
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings.durations['db'] += time.perf_counter() - started
+            self.timings.counts['db'] += 1
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет долю запросов, заданную PERF_SAMPLE_RATE (от 0 до 1).
+
+    Для замеренного запроса добавляет заголовок Server-Timing и
+    обновляет гистограммы, которые отдаёт страница /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        if not rate or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        timings = RequestTimings()
+        activate(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                timer = QueryTimer(timings)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            deactivate()
+        total = time.perf_counter() - started
+        view = self.view_name(request)
+        self.observe(view, total, timings)
+        response['Server-Timing'] = self.server_timing(total, timings)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unresolved'
+
+    @staticmethod
+    def observe(view, total, timings):
+        metrics.REQUEST_DURATION.observe(total, view)
+        metrics.DB_DURATION.observe(timings.durations['db'], view)
+        metrics.DB_QUERIES.observe(timings.counts['db'], view)
+        metrics.TEMPLATE_DURATION.observe(timings.durations['template'], view)
+        for result in ('hit', 'miss'):
+            hits = timings.counts[f'cache_{result}']
+            if hits:
+                metrics.CACHE_REQUESTS.inc(hits, view, result)
+
+    @staticmethod
+    def server_timing(total, timings):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}'
+
+        entries = [
+            f'total;dur={ms(total)}',
+            f'db;dur={ms(timings.durations["db"])};'
+            f'desc="{timings.counts["db"]} queries"',
+            f'tpl;dur={ms(timings.durations["template"])}',
+            f'cache;desc="hit {timings.counts["cache_hit"]}, '
+            f'miss {timings.counts["cache_miss"]}"',
+        ]
+        if 'thumbnail' in timings.durations:
+            entries.append(f'thumb;dur={ms(timings.durations["thumbnail"])}')
+        return ', '.join(entries)
@@ -0,0 +1,192 @@
+"""
+Журнал запросов к БД для разработки и тестов.
+
+QueryInspector подключается через connection.execute_wrapper и для
+каждого запроса запоминает место, откуда он выполнен: строку шаблона
+и ближайшие кадры кода проекта. По журналу находятся повторяющиеся
+запросы (типичный признак N+1) и медленные запросы.
+"""
+import logging
+import os
+import sys
+import time
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+Query = namedtuple('Query', 'alias sql params duration origin')
+Origin = namedtuple('Origin', 'template code')
+
+_RENDER_CODE = Node.render_annotated.__code__
+_PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+# Сколько кадров кода проекта запоминать для каждого запроса.
+STACK_DEPTH = 3
+
+
+def query_origin():
+    """Строка шаблона и кадры кода проекта, выполнившие запрос."""
+    project_dir = os.path.join(settings.BASE_DIR, '')
+    template = None
+    code = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        if template is None and frame.f_code is _RENDER_CODE:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                template = f'{name}:{token.lineno}'
+        filename = frame.f_code.co_filename
+        if (
+            len(code) < STACK_DEPTH
+            and filename.startswith(project_dir)
+            and not filename.startswith(_PERF_DIR)
+        ):
+            code.append(
+                f'{os.path.relpath(filename, project_dir)}:{frame.f_lineno} '
+                f'({frame.f_code.co_name})'
+            )
+        frame = frame.f_back
+    return Origin(template, tuple(code))
+
+
+class QueryInspector:
+    """
+    execute_wrapper, ведущий журнал запросов.
+
+    slow_query_ms — порог, начиная с которого запрос пишется в лог
+    с уровнем WARNING; None — не проверять.
+    """
+
+    def __init__(self, slow_query_ms=None):
+        self.slow_query_ms = slow_query_ms
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            query = Query(
+                context['connection'].alias, sql, repr(params), duration,
+                query_origin()
+            )
+            self.queries.append(query)
+            if (
+                self.slow_query_ms is not None
+                and duration * 1000 >= self.slow_query_ms
+            ):
+                logger.warning(
+                    'Медленный запрос (%.1f мс) из %s: %s',
+                    duration * 1000, format_origin(query.origin), sql
+                )
+
+    def _grouped(self, key, threshold):
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[key(query)].append(query)
+        return [
+            queries for queries in groups.values()
+            if len(queries) >= threshold
+        ]
+
+    def duplicates(self, threshold=2):
+        """Группы запросов с одинаковыми SQL и параметрами."""
+        return self._grouped(lambda q: (q.alias, q.sql, q.params), threshold)
+
+    def similar(self, threshold=2):
+        """Группы запросов с одинаковым SQL и любыми параметрами (N+1)."""
+        return self._grouped(lambda q: (q.alias, q.sql), threshold)
+
+    def report(self, threshold=2):
+        """Текстовый отчёт о повторяющихся запросах."""
+        lines = []
+        for queries in self.similar(threshold):
+            distinct = len({query.params for query in queries})
+            lines.append(
+                f'{len(queries)} × ({distinct} с разными параметрами) '
+                f'{queries[0].sql}'
+            )
+            origins = {query.origin for query in queries}
+            for origin in sorted(origins, key=format_origin):
+                lines.append(f'    из {format_origin(origin)}')
+        return '\n'.join(lines)
+
+
+def format_origin(origin):
+    parts = []
+    if origin.template:
+        parts.append(f'шаблон {origin.template}')
+    parts.extend(origin.code)
+    return ' ← '.join(parts) or 'неизвестно'
+
+
+@contextmanager
+def inspect_queries(slow_query_ms=None):
+    """Ведёт журнал запросов ко всем БД внутри блока."""
+    inspector = QueryInspector(slow_query_ms)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(inspector))
+        yield inspector
+
+
+@contextmanager
+def query_budget(max_queries, allow_duplicates=False):
+    """
+    Проверка для тестов: блок выполняет не больше max_queries запросов
+    и, если не указано иное, не повторяет один и тот же запрос.
+
+    Сообщение об ошибке содержит места в шаблонах и коде, откуда
+    выполнялись лишние запросы.
+    """
+    with inspect_queries() as inspector:
+        yield inspector
+    problems = []
+    if len(inspector.queries) > max_queries:
+        problems.append(
+            f'выполнено {len(inspector.queries)} запросов при бюджете '
+            f'{max_queries}'
+        )
+    if not allow_duplicates and inspector.duplicates():
+        problems.append('есть повторяющиеся запросы')
+    if problems:
+        raise AssertionError(
+            '; '.join(problems).capitalize() + ':\n'
+            + (inspector.report() or '\n'.join(
+                f'{query.sql}\n    из {format_origin(query.origin)}'
+                for query in inspector.queries
+            ))
+        )
+
+
+class QueryInspectorMiddleware:
+    """
+    Пишет в лог повторяющиеся и медленные запросы каждого запроса.
+
+    Включается настройкой QUERY_INSPECTOR; пороги задаются настройками
+    SLOW_QUERY_MS и DUPLICATE_QUERY_THRESHOLD.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTOR:
+            return self.get_response(request)
+        with inspect_queries(settings.SLOW_QUERY_MS) as inspector:
+            response = self.get_response(request)
+        report = inspector.report(settings.DUPLICATE_QUERY_THRESHOLD)
+        if report:
+            logger.warning(
+                'Повторяющиеся запросы на %s %s:\n%s',
+                request.method, request.get_full_path(), report
+            )
+        return response
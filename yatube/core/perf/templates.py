@@ -0,0 +1,27 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import timed
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд DjangoTemplates, учитывающий время рендеринга шаблонов.
+
+    Вложенные рендеры (например, карточки постов из тега post_card)
+    входят во время внешнего шаблона и повторно не учитываются.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
@@ -0,0 +1,93 @@
+import asyncio
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import SimpleTestCase
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+def echo_app(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    return [
+        environ['REQUEST_METHOD'].encode(), b' ',
+        environ['PATH_INFO'].encode('latin-1'), b'?',
+        environ['QUERY_STRING'].encode(), b' ',
+        environ['HTTP_X_TEST'].encode(), b' ',
+        environ['wsgi.input'].read(),
+    ]
+
+
+def run(application, scope, messages):
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class WsgiToAsgiTests(SimpleTestCase):
+    """Тестирование ASGI-адаптера для WSGI-приложения."""
+
+    def scope(self, path, method='GET', headers=()):
+        return {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'a=1',
+            'headers': [(b'host', b'localhost'), *headers],
+            'client': ('10.0.0.1', 5000),
+        }
+
+    def test_build_environ(self):
+        environ = build_environ(self.scope('/путь/', headers=[
+            (b'content-type', b'text/plain'),
+            (b'x-test', b'1'),
+            (b'x-test', b'2'),
+        ]), b'')
+        # По PEP 3333 путь передаётся байтами UTF-8 в строке latin-1.
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/путь/'
+        )
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TEST'], '1,2')
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+
+    def test_request_and_chunked_body(self):
+        """Тело запроса собирается из частей, ответ передаётся целиком."""
+        sent = run(
+            WsgiToAsgi(echo_app, max_workers=1),
+            self.scope('/echo/', 'POST', headers=[(b'x-test', b'yes')]),
+            [
+                {'type': 'http.request', 'body': b'he', 'more_body': True},
+                {'type': 'http.request', 'body': b'llo'},
+            ],
+        )
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'content-type', b'text/plain'), sent[0]['headers'])
+        self.assertEqual(sent[1]['body'], b'POST /echo/?a=1 yes hello')
+
+    def test_lifespan(self):
+        sent = run(
+            WsgiToAsgi(echo_app, max_workers=1),
+            {'type': 'lifespan'},
+            [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}],
+        )
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'],
+        )
+
+    def test_django_page(self):
+        """Страница Django отдаётся через адаптер."""
+        sent = run(
+            WsgiToAsgi(WSGIHandler(), max_workers=2),
+            self.scope('/about/author/'),
+            [{'type': 'http.request', 'body': b''}],
+        )
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn('Об авторе'.encode(), sent[1]['body'])
@@ -0,0 +1,111 @@
+import socket
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache.fake_server import FakeRedisServer
+from core.cache.redis import RedisCache
+from posts.models import Post, User
+
+
+class SharedCacheTests(TestCase):
+    """Тестирование общего кэша на локальном сервере с протоколом Redis."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+        cls.settings_override = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'core.cache.tiered.TieredCache',
+                'OPTIONS': {
+                    'L2': 'shared',
+                    'L1_TIMEOUT': 60,
+                    'L1_KEY_PREFIXES': ('hot:',),
+                },
+            },
+            'shared': {
+                'BACKEND': 'core.cache.redis.RedisCache',
+                'LOCATION': cls.server.location,
+            },
+        })
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+
+    def test_shared_cache_operations(self):
+        """Основные операции кэша через протокол Redis."""
+        self.shared.set('key', {'value': [1, 2]})
+        self.assertEqual(self.shared.get('key'), {'value': [1, 2]})
+        self.assertFalse(self.shared.add('key', 'other'))
+        self.assertTrue(self.shared.add('new', 5, None))
+        self.assertEqual(self.shared.incr('new', 3), 8)
+        self.assertEqual(
+            self.shared.get_many(['key', 'new', 'missing']),
+            {'key': {'value': [1, 2]}, 'new': 8}
+        )
+        self.shared.set_many({'a': 1, 'b': 'два'})
+        self.shared.delete_many(['a', 'key'])
+        self.assertFalse(self.shared.has_key('a'))
+        self.assertEqual(self.shared.get('b'), 'два')
+        with self.assertRaises(ValueError):
+            self.shared.incr('missing')
+        self.shared.set('expired', 1, 0)
+        self.assertIsNone(self.shared.get('expired'))
+
+    def test_hot_keys_served_from_local_tier(self):
+        """Горячие ключи читаются из L1, остальные — из общего кэша."""
+        self.cache.set('hot:card', 'old')
+        self.cache.set('version', 1)
+        self.shared.set('hot:card', 'new')
+        self.shared.set('version', 2)
+        self.assertEqual(self.cache.get('hot:card'), 'old')
+        self.assertEqual(self.cache.get('version'), 2)
+        self.assertEqual(
+            self.cache.get_many(['hot:card', 'version']),
+            {'hot:card': 'old', 'version': 2}
+        )
+
+    def test_feed_pages_with_shared_cache(self):
+        """Страницы с кэшированием работают на общем кэше."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост в общем кэше.')
+        for _ in range(2):
+            response = self.client.get(reverse('posts:index'))
+            self.assertContains(response, 'Пост в общем кэше.')
+        self.assertTrue(any(
+            key.startswith(b':1:version:')
+            for key in self.server.store.data
+        ))
+
+
+class RedisOutageTests(SimpleTestCase):
+    """Тестирование кэша при недоступном сервере."""
+
+    def setUp(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.cache = RedisCache(f'127.0.0.1:{port}', {})
+
+    def test_unavailable_server_fails_soft(self):
+        with self.assertLogs('core.cache.redis', 'WARNING') as logs:
+            self.assertEqual(self.cache.get('key', 'default'), 'default')
+            self.cache.set('key', 'value')
+            self.cache.delete('key')
+            self.assertEqual(self.cache.get_many(['key']), {})
+            self.assertEqual(self.cache.set_many({'key': 1}), ['key'])
+            self.assertFalse(self.cache.add('key', 'value'))
+            self.assertFalse(self.cache.has_key('key'))
+            with self.assertRaises(ValueError):
+                self.cache.incr('key')
+        self.assertEqual(len(logs.records), 1)
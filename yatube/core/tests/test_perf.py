@@ -0,0 +1,120 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import perf
+from core.perf.metrics import Counter, Histogram, Registry
+from posts.models import Post, User
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Тестирование замеров производительности запросов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост для замеров.')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for entry in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            with self.subTest(entry=entry):
+                self.assertIn(entry, timing)
+        queries = int(re.search(r'"(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+        self.assertRegex(timing, r'cache;desc="hit \d+, miss [1-9]\d*"')
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PERF_SAMPLE_RATE=1, METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', content
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"}',
+            content
+        )
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index"', content
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_access(self):
+        """Доступ только сотрудникам и по токену, не по адресу."""
+        url = reverse('metrics')
+        for headers in (
+            {'REMOTE_ADDR': '127.0.0.1'},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, 404)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_disables_header_access(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PerfHelpersTests(TestCase):
+    """Тестирование вспомогательных функций замеров."""
+    def test_nested_timed_blocks_counted_once(self):
+        timings = perf.RequestTimings()
+        perf.activate(timings)
+        try:
+            with perf.timed('template'):
+                with perf.timed('template'):
+                    pass
+                perf.count('cache_hit', 2)
+        finally:
+            perf.deactivate()
+        self.assertGreater(timings.durations['template'], 0)
+        self.assertEqual(timings.counts['cache_hit'], 2)
+        with perf.timed('template'):
+            perf.count('cache_hit')
+        self.assertEqual(timings.counts['cache_hit'], 2)
+
+    def test_prometheus_format(self):
+        registry = Registry()
+        histogram = registry.register(Histogram(
+            'test_seconds', 'Тест.', labels=('view',), buckets=(0.1, 1)
+        ))
+        counter = registry.register(Counter('test_hits', 'Тест.'))
+        histogram.observe(0.05, 'a"b')
+        histogram.observe(5, 'a"b')
+        counter.inc(3)
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_seconds Тест.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="a\\"b",le="0.1"} 1',
+            'test_seconds_bucket{view="a\\"b",le="1"} 1',
+            'test_seconds_bucket{view="a\\"b",le="+Inf"} 2',
+            'test_seconds_sum{view="a\\"b"} 5.05',
+            'test_seconds_count{view="a\\"b"} 2',
+            '# HELP test_hits_total Тест.',
+            '# TYPE test_hits_total counter',
+            'test_hits_total 3',
+        ])
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.perf.queries import inspect_queries, query_budget
+from posts.models import Post, User
+
+
+class QueryInspectorTests(TestCase):
+    """Тестирование журнала запросов к БД."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('leo', 'fedor', 'anton'):
+            author = User.objects.create_user(username=name)
+            Post.objects.create(author=author, text=f'Пост {name}.')
+
+    def setUp(self):
+        cache.clear()
+
+    def render_authors(self, posts):
+        template = Template(
+            '{% for post in posts %}\n'
+            '{{ post.author.username }}\n'
+            '{% endfor %}'
+        )
+        return template.render(Context({'posts': posts}))
+
+    def test_n_plus_one_is_traced_to_template_line(self):
+        with inspect_queries() as inspector:
+            self.render_authors(Post.objects.all())
+        groups = inspector.similar(threshold=3)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(len(groups[0]), 3)
+        self.assertEqual(inspector.duplicates(), [])
+        report = inspector.report()
+        self.assertIn('шаблон <unknown source>:2', report)
+        self.assertIn('core/tests/test_queries.py', report)
+
+    def test_query_budget(self):
+        with query_budget(1):
+            self.render_authors(Post.objects.select_related('author'))
+        with self.assertRaisesRegex(AssertionError, 'при бюджете 1'):
+            with query_budget(1):
+                self.render_authors(Post.objects.all())
+
+    def test_query_budget_for_views(self):
+        with query_budget(3):
+            self.client.get(reverse('posts:index'))
+
+    def test_duplicates_fail_budget(self):
+        with self.assertRaisesRegex(AssertionError, 'повторяющиеся'):
+            with query_budget(10):
+                list(Post.objects.all())
+                list(Post.objects.all())
+
+    @override_settings(QUERY_INSPECTOR=True, SLOW_QUERY_MS=0)
+    def test_middleware_logs_slow_queries(self):
+        with self.assertLogs('core.perf.queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('Медленный запрос', logs.output[0])
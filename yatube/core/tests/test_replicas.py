@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core.db.replicas import PIN_COOKIE, ReplicaRouter, request_scope
+from core.management.commands.sync_replicas import copy_database
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Тестирование маршрутизации чтений на реплики."""
+    # Без транзакции TestCase: внутри неё чтения всегда идут в основную БД.
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_safe_request_reads_from_replicas(self):
+        with request_scope(use_replicas=True):
+            self.assertIn(
+                self.router.db_for_read(Post), ('replica1', 'replica2')
+            )
+
+    def test_unsafe_request_reads_from_primary(self):
+        with request_scope(use_replicas=False):
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_reads_after_write_use_primary(self):
+        with request_scope(use_replicas=True) as state:
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertTrue(state.wrote)
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_reads_inside_transaction_use_primary(self):
+        with request_scope(use_replicas=True), transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+
+class ReplicaMiddlewareTests(TestCase):
+    """Тестирование закрепления пользователя за основной БД."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='leo')
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста.')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_to_primary(self):
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий.'},
+        )
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+
+class SyncReplicasTests(TransactionTestCase):
+    """Тестирование команды sync_replicas."""
+    # backup API ждёт, пока у источника открыта транзакция, поэтому
+    # тест работает без обёртки TestCase.
+
+    def test_copy_database(self):
+        Post.objects.create(
+            author=User.objects.create_user(username='leo'),
+            text='Текст поста.',
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'replica.sqlite3')
+            copy_database(connection, name)
+            replica = sqlite3.connect(name)
+            try:
+                rows = replica.execute(
+                    f'SELECT text FROM {Post._meta.db_table}'
+                ).fetchall()
+            finally:
+                replica.close()
+        self.assertEqual(rows, [('Текст поста.',)])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_requires_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas')
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+WRITERS = 4
+READERS = 4
+WRITES = 50
+
+
+class SqliteTuningTests(SimpleTestCase):
+    """Тестирование настроек соединений SQLite на файле БД."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.name = os.path.join(directory.name, 'stress.sqlite3')
+        with self.connect() as cursor:
+            cursor.execute(
+                'CREATE TABLE stress (id INTEGER PRIMARY KEY, value TEXT)'
+            )
+
+    @contextmanager
+    def connect(self):
+        """Курсор нового соединения Django с настройками default."""
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.name}, 'stress'
+        )
+        try:
+            yield wrapper.cursor()
+        finally:
+            wrapper.close()
+
+    def test_pragmas(self):
+        with self.connect() as cursor:
+            values = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        self.assertEqual(
+            values,
+            {
+                'journal_mode': 'wal',
+                'synchronous': 1,
+                'busy_timeout': int(
+                    connection.settings_dict['OPTIONS']['timeout'] * 1000
+                ),
+            },
+        )
+
+    def test_read_does_not_wait_for_write_transaction(self):
+        with self.connect() as writer, self.connect() as reader:
+            writer.execute('BEGIN IMMEDIATE')
+            writer.execute("INSERT INTO stress (value) VALUES ('x')")
+            started = time.perf_counter()
+            reader.execute('SELECT COUNT(*) FROM stress')
+            self.assertEqual(reader.fetchone()[0], 0)
+            self.assertLess(time.perf_counter() - started, 1)
+            writer.execute('COMMIT')
+
+    def test_write_does_not_wait_for_read_transaction(self):
+        with self.connect() as writer, self.connect() as reader:
+            reader.execute('BEGIN')
+            reader.execute('SELECT COUNT(*) FROM stress')
+            started = time.perf_counter()
+            writer.execute("INSERT INTO stress (value) VALUES ('x')")
+            self.assertLess(time.perf_counter() - started, 1)
+            reader.execute('SELECT COUNT(*) FROM stress')
+            self.assertEqual(reader.fetchone()[0], 0)
+            reader.execute('COMMIT')
+            reader.execute('SELECT COUNT(*) FROM stress')
+            self.assertEqual(reader.fetchone()[0], 1)
+
+    def write(self, number):
+        with self.connect() as cursor:
+            self.writing.set()
+            for index in range(WRITES):
+                cursor.execute(
+                    'INSERT INTO stress (value) VALUES (%s)',
+                    [f'{number}-{index}'],
+                )
+
+    def read(self):
+        with self.connect() as cursor:
+            self.writing.wait()
+            count = 0
+            while not self.writers_done.is_set():
+                cursor.execute('SELECT COUNT(*) FROM stress')
+                cursor.fetchone()
+                count += 1
+        return count
+
+    def run_thread(self, target, *args):
+        try:
+            self.results.append(target(*args))
+        except Exception as error:
+            self.errors.append(error)
+
+    def test_parallel_reads_and_writes(self):
+        self.errors = []
+        self.results = []
+        self.writing = threading.Event()
+        self.writers_done = threading.Event()
+        readers = [
+            threading.Thread(target=self.run_thread, args=(self.read,))
+            for _ in range(READERS)
+        ]
+        writers = [
+            threading.Thread(
+                target=self.run_thread, args=(self.write, number)
+            )
+            for number in range(WRITERS)
+        ]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        self.writers_done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(self.errors, [])
+        reads = [count for count in self.results if count is not None]
+        self.assertEqual(len(reads), READERS)
+        self.assertTrue(all(reads))
+        with self.connect() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM stress')
+            self.assertEqual(cursor.fetchone()[0], WRITERS * WRITES)
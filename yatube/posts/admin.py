@@ -1,27 +1,205 @@
+import time
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+
+from . import moderation, search
+from .constants import ADMIN_EXACT_COUNT_LIMIT
+from .models import Post, Group, Comment, Follow, User
+
+
+def estimated_rows(model):
+    """Число строк таблицы по статистике СУБД или None, если её нет."""
+    table = model._meta.db_table
+    queries = {
+        'postgresql': (
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+        ),
+        'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(queries[connection.vendor], [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без COUNT(*) по всей таблице.
+
+    Для списка без фильтров берётся оценка из статистики СУБД, если
+    она больше ADMIN_EXACT_COUNT_LIMIT; иначе строки считаются точно,
+    но не дальше ADMIN_EXACT_COUNT_LIMIT + 1.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model)
+            if estimate is not None and estimate > ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:ADMIN_EXACT_COUNT_LIMIT + 1].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Общие настройки списков для больших таблиц."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'created'
+    empty_value_display = '-пусто-'
 
-from .models import Post, Group, Comment, Follow
+    def run_moderation(self, request, operation, message, *args):
+        """Выполняет операцию модерации и сообщает, сколько она заняла."""
+        started = time.perf_counter()
+        count = operation(*args)
+        self.message_user(
+            request,
+            f'{message}: {count} за {time.perf_counter() - started:.2f} с.'
+        )
+
+    def confirm_for_authors(self, request, queryset, question):
+        """
+        Страница подтверждения для действия над всеми объектами авторов
+        выбранных строк. Возвращает id авторов после подтверждения.
+        """
+        author_ids = list(
+            queryset.order_by().values_list('author_id', flat=True).distinct()
+        )
+        if request.POST.get('post') == 'yes':
+            return author_ids, None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Подтверждение',
+            'question': question,
+            'opts': self.model._meta,
+            'authors': User.objects.filter(
+                pk__in=author_ids
+            ).select_related('stats').order_by('username'),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action': request.POST.get('action'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return None, TemplateResponse(
+            request, 'admin/posts/confirm_moderation.html', context
+        )
+
+
+class GroupActionForm(helpers.ActionForm):
+    # Автодополнение загружает группы по мере ввода, а не все сразу.
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        empty_label='без группы',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'group')
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('created',)
-    empty_value_display = '-пусто-'
+    action_form = GroupActionForm
+    actions = ('move_to_group', 'delete_authors_posts')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE '%...%'."""
+        if not search_term:
+            return queryset, False
+        return (
+            search.get_backend().filter_posts(queryset, search_term), False
+        )
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            self.message_user(request, 'Выберите группу.', level='error')
+            return
+        self.run_moderation(
+            request, moderation.move_posts, 'Перенесено постов',
+            queryset.values_list('pk', flat=True), form.cleaned_data['group']
+        )
+    move_to_group.short_description = 'Перенести в выбранную группу'
+
+    def delete_authors_posts(self, request, queryset):
+        author_ids, confirmation = self.confirm_for_authors(
+            request, queryset,
+            'Удалить все посты этих авторов вместе с комментариями к ним?'
+        )
+        if confirmation is not None:
+            return confirmation
+        self.run_moderation(
+            request, moderation.delete_posts_by_authors, 'Удалено постов',
+            author_ids
+        )
+    delete_authors_posts.short_description = (
+        'Удалить все посты авторов выбранных постов'
+    )
 
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    pass
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    search_fields = ('text',)
+    actions = ('purge_authors_comments',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return (
+            search.get_backend().filter_comments(queryset, search_term),
+            False,
+        )
+
+    def purge_authors_comments(self, request, queryset):
+        author_ids, confirmation = self.confirm_for_authors(
+            request, queryset, 'Удалить все комментарии этих пользователей?'
+        )
+        if confirmation is not None:
+            return confirmation
+        self.run_moderation(
+            request, moderation.purge_comments, 'Удалено комментариев',
+            author_ids
+        )
+    purge_authors_comments.short_description = (
+        'Удалить все комментарии авторов выбранных комментариев'
+    )
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,192 @@
+"""
+JSON API только для чтения: ленты, пост и его комментарии.
+
+Ответы поддерживают условные запросы: ETag лент строится из их версий
+в кэше (см. caching), поэтому повторный запрос с If-None-Match
+получает 304 без обращений к БД. Last-Modified отдаётся только там,
+где есть время изменения, которое не уменьшается при удалении: поле
+modified группы и автора, поле updated поста. У главной ленты такого
+поля нет, и она проверяется только по ETag.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from . import caching, timeline
+from .constants import COMMENTS_PAGE_LIMIT, PAGINATOR_LIMIT
+from .models import Comment, Group, Post, User, UserStats
+from .utils import CURSOR_PARAM, CursorPaginator, conditional_response
+
+
+def serialize_post(post, detail=False):
+    """
+    Пост для ответа API.
+
+    Счётчик комментариев есть только в ответе для одного поста: версии
+    лент при комментировании не меняются.
+    """
+    data = {
+        'id': post.pk,
+        'text': post.text,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'created': post.created.isoformat(),
+        'updated': post.updated.isoformat(),
+    }
+    if detail:
+        data['comments_count'] = post.comments_count
+    return data
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'author_url': reverse(
+            'posts:profile', args=[comment.author.username]
+        ),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def json_response(payload):
+    return JsonResponse(
+        payload,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def conditional(request, etag, last_modified, build, private=False):
+    """Условный JSON-ответ; build возвращает тело ответа."""
+    response = conditional_response(
+        request, etag, last_modified, lambda: json_response(build())
+    )
+    patch_cache_control(
+        response, no_cache=True, **{'private' if private else 'public': True}
+    )
+    return response
+
+
+def page_url(request, page):
+    if not page.has_next():
+        return None
+    return f'{request.path}?{CURSOR_PARAM}={page.next_cursor}'
+
+
+def feed_response(request, posts, scope, last_modified=None):
+    cursor = request.GET.get(CURSOR_PARAM, '')
+
+    def build():
+        page = CursorPaginator(posts, PAGINATOR_LIMIT).get_page(cursor)
+        return {
+            'posts': [serialize_post(post) for post in page],
+            'next': page_url(request, page),
+        }
+
+    return conditional(
+        request,
+        f'{caching.feed_version(scope)}:{cursor}',
+        last_modified,
+        build,
+    )
+
+
+def index(request):
+    return feed_response(
+        request, Post.objects.feed(), caching.index_scope()
+    )
+
+
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('id', 'modified'), slug=slug)
+    return feed_response(
+        request, group.posts.feed(), caching.group_scope(group.pk),
+        lambda: group.modified,
+    )
+
+
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return feed_response(
+        request, author.posts.feed(), caching.profile_scope(author.pk),
+        lambda: UserStats.objects.for_user(author).modified,
+    )
+
+
+def follow_index(request):
+    """
+    Лента подписок.
+
+    У ленты нет версии в кэше, поэтому ETag считается по выбранной
+    странице: повторный ответ экономит трафик, но не запросы к БД.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Требуется авторизация.'}, status=401)
+    page = CursorPaginator(
+        timeline.feed_for(request.user), PAGINATOR_LIMIT
+    ).get_page(request.GET.get(CURSOR_PARAM))
+    digest = hashlib.sha1()
+    for post in page:
+        digest.update(f'{post.pk}:{post.updated.isoformat()};'.encode())
+    digest.update(str(page.next_cursor).encode())
+    return conditional(
+        request,
+        digest.hexdigest(),
+        lambda: max((post.updated for post in page), default=None),
+        lambda: {
+            'posts': [serialize_post(post) for post in page],
+            'next': page_url(request, page),
+        },
+        private=True,
+    )
+
+
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
+    versions = caching.get_versions(
+        caching.version_key(caching.POST, post.pk),
+        caching.version_key(caching.USER, post.author_id),
+        caching.version_key(caching.GROUP, post.group_id),
+    )
+    return conditional(
+        request,
+        'post:' + '.'.join(str(v) for v in versions)
+        + f':{post.comments_count}',
+        lambda: post.updated,
+        lambda: serialize_post(post, detail=True),
+    )
+
+
+def post_comments(request, post_id):
+    """Страница комментариев поста; используется и для подгрузки на сайте."""
+    post = get_object_or_404(Post.objects.only('id', 'updated'), id=post_id)
+    comments = Comment.objects.filter(post_id=post.pk)
+    summary = comments.order_by().aggregate(
+        count=Count('pk'), last_id=Max('pk')
+    )
+    cursor = request.GET.get(CURSOR_PARAM, '')
+
+    def build():
+        page = CursorPaginator(
+            comments.select_related('author'), COMMENTS_PAGE_LIMIT
+        ).get_page(cursor)
+        return {
+            'count': summary['count'],
+            'comments': [serialize_comment(comment) for comment in page],
+            'next': page_url(request, page),
+        }
+
+    return conditional(
+        request,
+        f'comments:{post.pk}:{summary["count"]}:{summary["last_id"]}:'
+        f'{cursor}',
+        # updated меняется при каждом добавлении и удалении комментария.
+        lambda: post.updated,
+        build,
+    )
@@ -0,0 +1,87 @@
+"""
+Версионированные ключи кэша для отрендеренных фрагментов страниц.
+
+Вместо удаления закэшированных фрагментов при изменении данных
+увеличивается номер версии соответствующего объекта: новые ключи
+перестают совпадать со старыми, а устаревшие записи вытесняются
+кэшем по таймауту.
+"""
+import time
+
+from django.core.cache import cache
+
+POST = 'post'
+USER = 'user'
+GROUP = 'group'
+FEED = 'feed'
+# Общая версия всех лент: меняется вместе с именами авторов и групп,
+# которые выводятся в карточках на любой странице.
+ALL_FEEDS = 'all'
+
+
+def version_key(kind, pk):
+    return f'version:{kind}:{pk}'
+
+
+def get_versions(*keys):
+    """
+    Возвращает текущие версии для ключей одним обращением к кэшу.
+
+    Отсутствующая версия инициализируется текущим временем, чтобы после
+    вытеснения ключа из кэша не совпасть со старыми фрагментами.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(kind, pk):
+    key = version_key(kind, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_versions(kind, pks):
+    """Меняет версии нескольких объектов одним обращением к кэшу."""
+    version = time.time_ns()
+    cache.set_many({version_key(kind, pk): version for pk in pks}, None)
+
+
+def post_card_key(post, show_group_link):
+    versions = get_versions(
+        version_key(POST, post.pk),
+        version_key(USER, post.author_id),
+        version_key(GROUP, post.group_id),
+    )
+    version = '.'.join(str(v) for v in versions)
+    return f'post_card:{post.pk}:{version}:{int(bool(show_group_link))}'
+
+
+def feed_version(scope):
+    """Версия ленты вида 'index:1.2' для ключа кэша её фрагмента."""
+    versions = get_versions(
+        version_key(FEED, ALL_FEEDS), version_key(FEED, scope)
+    )
+    return f'{scope}:' + '.'.join(str(v) for v in versions)
+
+
+def index_scope():
+    return 'index'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def bump_feeds(*scopes):
+    for scope in scopes:
+        bump_version(FEED, scope)
@@ -1,2 +1,33 @@
 POST_LIMIT = 15
 PAGINATOR_LIMIT = 10
+# Комментариев на одной странице под постом.
+COMMENTS_PAGE_LIMIT = 20
+# Для авторов с большим числом подписчиков посты не раскладываются
+# по лентам при публикации, а подмешиваются при чтении.
+FANOUT_FOLLOWERS_LIMIT = 1000
+FANOUT_BATCH_SIZE = 1000
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Варианты картинки поста для srcset: имя и размер миниатюры.
+IMAGE_VARIANTS = (
+    ('thumb', '320x113'),
+    ('mobile', '640x226'),
+    ('desktop', '960x339'),
+    ('retina', '1920x678'),
+)
+# Вариант для атрибута src; строится всегда, даже с увеличением.
+DEFAULT_IMAGE_VARIANT = 'desktop'
+IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# Сколько секунд изображение считается «в работе» у фонового генератора.
+THUMBNAIL_PENDING_TIMEOUT = 60
+# Загружаемые картинки уменьшаются до этих размеров и перекодируются.
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_JPEG_QUALITY = 85
+# Максимальное число слов в поисковом запросе.
+SEARCH_MAX_TOKENS = 10
+# Больше стольких строк админка не считает точно: для больших таблиц
+# берётся оценка из статистики СУБД.
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# Размер порции для массовых операций модерации.
+MODERATION_BATCH_SIZE = 1000
@@ -0,0 +1,82 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, ImageSequence
+
+from .constants import IMAGE_JPEG_QUALITY, IMAGE_MAX_SIZE
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+# Форматы, в которых сохраняются анимированные картинки.
+ANIMATED_EXTENSIONS = {'GIF': 'gif', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def normalize_animation(image):
+    """
+    Уменьшает анимированную картинку покадрово до IMAGE_MAX_SIZE.
+
+    Кадры перекодируются в исходный формат с прежними длительностями
+    и числом повторов, метаданные не переносятся.
+    """
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        frame.thumbnail(IMAGE_MAX_SIZE, Image.LANCZOS)
+        # Иначе комментарии и профили кадра попадут в новый файл.
+        frame.info.clear()
+        frames.append(frame)
+    buffer = BytesIO()
+    frames[0].save(
+        buffer,
+        image.format,
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        loop=image.info.get('loop', 0),
+    )
+    return buffer.getvalue(), frames[0].size
+
+
+def normalize_image(uploaded):
+    """
+    Подготавливает загруженную картинку к хранению.
+
+    Поворачивает по EXIF, уменьшает до IMAGE_MAX_SIZE и перекодирует
+    без метаданных: в прогрессивный JPEG или, для картинок
+    с прозрачностью, в PNG. Анимированные GIF, PNG и WebP уменьшаются
+    покадрово и сохраняют формат. Возвращает файл и размеры картинки.
+    """
+    uploaded.seek(0)
+    image = Image.open(uploaded)
+    name = os.path.splitext(os.path.basename(uploaded.name))[0]
+    if (
+        getattr(image, 'is_animated', False)
+        and image.format in ANIMATED_EXTENSIONS
+    ):
+        content, size = normalize_animation(image)
+        extension = ANIMATED_EXTENSIONS[image.format]
+        return ContentFile(content, f'{name}.{extension}'), size
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(IMAGE_MAX_SIZE, Image.LANCZOS)
+    buffer = BytesIO()
+    if has_alpha(image):
+        image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.convert('RGB').save(
+            buffer,
+            'JPEG',
+            quality=IMAGE_JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        extension = 'jpg'
+    return ContentFile(buffer.getvalue(), f'{name}.{extension}'), image.size
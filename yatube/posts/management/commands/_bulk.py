@@ -0,0 +1,35 @@
+import copy
+
+from django.db.models import QuerySet
+
+AUTO_DATE_FLAGS = ('auto_now', 'auto_now_add')
+
+
+def without_auto_dates(field):
+    """Копия поля без auto_now и auto_now_add; само поле не меняется."""
+    if not any(getattr(field, flag, False) for flag in AUTO_DATE_FLAGS):
+        return field
+    field = copy.copy(field)
+    for flag in AUTO_DATE_FLAGS:
+        setattr(field, flag, False)
+    return field
+
+
+class DatedQuerySet(QuerySet):
+    """
+    QuerySet, чей bulk_create сохраняет даты, заданные в объектах.
+
+    Обычный bulk_create вызывает pre_save полей, и auto_now с auto_now_add
+    заменяют даты текущим временем. Здесь INSERT строится по копиям полей
+    без этих флагов, поэтому другие потоки, сохраняющие ту же модель,
+    по-прежнему получают автоматические даты.
+    """
+
+    def _insert(self, objs, fields, *args, **kwargs):
+        fields = [without_auto_dates(field) for field in fields]
+        return super()._insert(objs, fields, *args, **kwargs)
+
+
+def bulk_create_dated(model, objs, **kwargs):
+    """model.objects.bulk_create с датами created и updated из объектов."""
+    return DatedQuerySet(model).bulk_create(objs, **kwargs)
@@ -0,0 +1,174 @@
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from posts import search, timeline
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from ._bulk import bulk_create_dated
+
+BATCH_SIZE = 1000
+WORDS = (
+    'город', 'море', 'книга', 'осень', 'кофе', 'поезд', 'музыка', 'лес',
+    'работа', 'кино', 'дом', 'утро', 'друг', 'дорога', 'снег', 'горы',
+    'история', 'проект', 'выходные', 'фотография', 'кот', 'рецепт', 'сад',
+    'дождь', 'концерт', 'отпуск', 'вечер', 'река', 'школа', 'спорт',
+)
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Seeder:
+    """
+    Генератор воспроизводимых наборов данных для нагрузочных замеров.
+
+    Популярность авторов распределена по закону Ципфа с показателем skew:
+    немногие авторы пишут большую часть постов и собирают большую часть
+    подписчиков, как в настоящих социальных сетях. При одинаковых seed
+    и параметрах набор данных получается одинаковым.
+    """
+
+    def __init__(self, seed=None, skew=1.0, log=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.skew = skew
+        self.log = log or (lambda message: None)
+        self.prefix = f'seed{seed}' if seed is not None else (
+            f'seed{time.time_ns()}'
+        )
+
+    def usernames_taken(self):
+        return User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).exists()
+
+    def run(self, users_num, groups_num, posts_num, comments_num=0,
+            follows_per_user=10):
+        started = time.perf_counter()
+        users = self.create_users(users_num)
+        groups = self.create_groups(groups_num)
+        author_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** self.skew for rank in range(len(users))
+        ))
+        self.create_posts(users, author_weights, groups, posts_num)
+        self.create_follows(users, author_weights, follows_per_user)
+        self.create_comments(users, comments_num)
+        for batch in batched(users):
+            UserStats.objects.rebuild(batch)
+        Post.objects.filter(
+            author__username__startswith=f'{self.prefix}_'
+        ).rebuild_comments_count()
+        entries = timeline.backfill_all()
+        self.log(f'Записей в лентах подписок: {entries}.')
+        search.get_backend().rebuild()
+        self.log(
+            f'Набор данных {self.prefix} создан '
+            f'за {time.perf_counter() - started:.1f} с.'
+        )
+        return users
+
+    def text(self, low=5, high=30):
+        words = self.random.choices(WORDS, k=self.random.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def create_users(self, users_num):
+        password = make_password(None)
+        for batch in batched(range(users_num)):
+            User.objects.bulk_create(
+                User(username=f'{self.prefix}_{i}', password=password)
+                for i in batch
+            )
+        users = list(
+            User.objects.filter(username__startswith=f'{self.prefix}_')
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.log(f'Пользователей: {len(users)}.')
+        return users
+
+    def create_groups(self, groups_num):
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {i}',
+                slug=f'{self.prefix}-{i}',
+                description=self.text(),
+            )
+            for i in range(groups_num)
+        )
+        return list(
+            Group.objects.filter(slug__startswith=f'{self.prefix}-')
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        ) + [None]
+
+    def create_posts(self, users, author_weights, groups, posts_num):
+        now = timezone.now()
+        for batch in batched(range(posts_num)):
+            authors = self.random.choices(
+                users, cum_weights=author_weights, k=len(batch)
+            )
+            bulk_create_dated(Post, (
+                Post(
+                    author_id=author_id,
+                    group_id=self.random.choice(groups),
+                    text=self.text(),
+                    created=now - timedelta(minutes=i),
+                    updated=now - timedelta(minutes=i),
+                )
+                for i, author_id in zip(batch, authors)
+            ))
+            self.log(f'Постов: {batch[-1] + 1} из {posts_num}.')
+
+    def create_follows(self, users, author_weights, follows_per_user):
+        created = 0
+        for batch in batched(users):
+            follows = {
+                (user_id, author_id)
+                for user_id in batch
+                for author_id in self.random.choices(
+                    users, cum_weights=author_weights,
+                    k=self.random.randint(0, 2 * follows_per_user),
+                )
+                if user_id != author_id
+            }
+            Follow.objects.bulk_create(
+                (Follow(user_id=u, author_id=a) for u, a in sorted(follows)),
+                ignore_conflicts=True,
+            )
+            created += len(follows)
+        self.log(f'Подписок: {created}.')
+
+    def create_comments(self, users, comments_num):
+        if not comments_num:
+            return
+        post_ids = list(
+            Post.objects.filter(
+                author__username__startswith=f'{self.prefix}_'
+            )
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        if not post_ids:
+            return
+        now = timezone.now()
+        for batch in batched(range(comments_num)):
+            bulk_create_dated(Comment, (
+                Comment(
+                    post_id=self.random.choice(post_ids),
+                    author_id=self.random.choice(users),
+                    text=self.text(1, 10),
+                    created=now - timedelta(seconds=i),
+                )
+                for i in batch
+            ))
+        self.log(f'Комментариев: {comments_num}.')
@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from core.asgi import WsgiToAsgi, build_environ, call_wsgi
+from .benchmark_views import benchmark_pages, percentile
+
+
+def http_scope(url):
+    parts = urlsplit(url)
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'localhost')],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность страниц posts при параллельных '
+        'соединениях: WSGI-обработчик в потоке на соединение против '
+        'ASGI-адаптера core.asgi с общим пулом потоков. Замер идёт внутри '
+        'процесса, без сетевого сервера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Количество запросов в каждом замере.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 8, 32],
+            help='Числа одновременных соединений.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Размер пула потоков ASGI-адаптера.'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес для замера; по умолчанию — страницы лент.'
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError(
+                '--requests и --concurrency должны быть положительными.'
+            )
+        urls = options['paths'] or [
+            url for url, user in benchmark_pages().values() if user is None
+        ]
+        if not urls:
+            raise CommandError(
+                'В базе нет постов; заполните её командой seed_data.'
+            )
+        wsgi_app = WSGIHandler()
+        for url in urls:
+            call_wsgi(wsgi_app, build_environ(http_scope(url), b''))
+        report = []
+        for concurrency in options['concurrency']:
+            for mode, measure in (
+                ('wsgi', self.measure_wsgi), ('asgi', self.measure_asgi)
+            ):
+                started = time.perf_counter()
+                timings = measure(
+                    wsgi_app, urls, options['requests'], concurrency,
+                    options['workers'],
+                )
+                elapsed = time.perf_counter() - started
+                result = {
+                    'mode': mode,
+                    'concurrency': concurrency,
+                    'rps': round(len(timings) / elapsed, 1),
+                    'p50_ms': round(percentile(timings, 50), 2),
+                    'p99_ms': round(percentile(timings, 99), 2),
+                    'mean_ms': round(statistics.mean(timings), 2),
+                }
+                report.append(result)
+                self.stdout.write(
+                    f'{mode} × {concurrency}: {result["rps"]} запросов/с, '
+                    f'p50 {result["p50_ms"]} мс, p99 {result["p99_ms"]} мс'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+
+    def measure_wsgi(self, wsgi_app, urls, requests, concurrency, workers):
+        """Поток на соединение, как у многопоточного WSGI-сервера."""
+        def request(url):
+            started = time.perf_counter()
+            call_wsgi(wsgi_app, build_environ(http_scope(url), b''))
+            return (time.perf_counter() - started) * 1000
+
+        queue = itertools.islice(itertools.cycle(urls), requests)
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(request, queue))
+
+    def measure_asgi(self, wsgi_app, urls, requests, concurrency, workers):
+        """Соединения — сопрограммы в одном цикле событий."""
+        application = WsgiToAsgi(wsgi_app, max_workers=workers)
+        queue = itertools.islice(itertools.cycle(urls), requests)
+        timings = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            pass
+
+        async def connection():
+            for url in queue:
+                started = time.perf_counter()
+                await application(http_scope(url), receive, send)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        async def main():
+            await asyncio.gather(*(connection() for _ in range(concurrency)))
+
+        try:
+            asyncio.run(main())
+        finally:
+            application.executor.shutdown(wait=True)
+        return timings
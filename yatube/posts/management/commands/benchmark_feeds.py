@@ -0,0 +1,119 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.constants import PAGINATOR_LIMIT
+from posts.models import Comment, Group, Post, User
+from posts.utils import CursorPaginator
+from ._seed import Seeder
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми постами и выводит планы и время '
+        'выполнения запросов лент.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10000,
+            help='Сколько постов добавить перед замерами (0 — не добавлять).'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--deep-page', type=int, default=101,
+            help='Номер «глубокой» страницы для замеров.'
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Сохранить добавленные данные вместо отката транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['posts']:
+                    self.seed(
+                        options['users'], options['groups'], options['posts']
+                    )
+                self.report(options['repeat'], options['deep_page'])
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('Добавленные данные удалены.')
+
+    def seed(self, users_num, groups_num, posts_num):
+        Seeder(log=self.stdout.write).run(users_num, groups_num, posts_num)
+        self.stdout.write(f'Добавлено постов: {posts_num}.')
+
+    def feed_querysets(self):
+        author = User.objects.order_by('-stats__posts_count').first()
+        reader = User.objects.order_by('-stats__following_count').first()
+        group = Group.objects.order_by('-pk').first()
+        post = Post.objects.order_by('-pk').first()
+        return {
+            'index': Post.objects.feed(),
+            'group_posts': Post.objects.feed().filter(group=group),
+            'profile': Post.objects.feed().filter(author=author),
+            'follow_index': timeline.feed_for(reader),
+            'post_detail comments': (
+                Comment.objects.filter(post=post).select_related('author')
+            ),
+        }
+
+    def measure(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings), statistics.median(timings)
+
+    def pages(self, queryset, deep_page):
+        """
+        Запросы страниц в том виде, в каком их выполняют ленты.
+
+        По умолчанию ленты листаются курсором (CursorPaginator), OFFSET
+        остаётся только для явного ?page=.
+        """
+        paginator = CursorPaginator(queryset, PAGINATOR_LIMIT)
+        deep_offset = PAGINATOR_LIMIT * (deep_page - 1)
+        pages = {'первая страница': paginator.rows_after(None)}
+        # Курсор глубокой страницы — последняя строка предыдущей.
+        position = (
+            queryset.order_by('-created', '-pk')
+            .values_list('created', 'pk')[deep_offset - 1:deep_offset]
+            .first()
+        )
+        if position is not None:
+            pages[f'{deep_page}-я страница, курсор'] = (
+                paginator.rows_after(position)
+            )
+        pages[f'{deep_page}-я страница, ?page='] = (
+            queryset[deep_offset:deep_offset + PAGINATOR_LIMIT]
+        )
+        return pages
+
+    def report(self, repeat, deep_page):
+        for name, queryset in self.feed_querysets().items():
+            pages = self.pages(queryset, deep_page)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, page in pages.items():
+                if not label.endswith('?page='):
+                    self.stdout.write(f'  {label}, план:')
+                    self.stdout.write(page.explain())
+            for label, page in pages.items():
+                fastest, median = self.measure(page, repeat)
+                self.stdout.write(
+                    f'  {label}: min {fastest:.2f} мс, '
+                    f'медиана {median:.2f} мс'
+                )
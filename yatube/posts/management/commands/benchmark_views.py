@@ -0,0 +1,218 @@
+import json
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.constants import PAGINATOR_LIMIT
+from posts.models import Comment, Group, Post, User
+from posts.utils import (
+    CURSOR_NEXT, CURSOR_PARAM, PAGE_PARAM, encode_cursor
+)
+
+# Метрики отчёта, которые сравниваются с эталоном.
+COMPARED_METRICS = ('p50_ms', 'p90_ms', 'p99_ms', 'queries', 'peak_kib')
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def benchmark_pages():
+    """Страницы для замеров на самых нагруженных объектах базы."""
+    post = Post.objects.order_by('-pk').first()
+    if post is None:
+        return {}
+    author = User.objects.order_by('-stats__posts_count').first()
+    reader = User.objects.order_by('-stats__following_count').first()
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    commented = Comment.objects.values('post_id').annotate(
+        total=Count('pk')
+    ).order_by('-total').first()
+    deep_page = max(Post.objects.count() // PAGINATOR_LIMIT // 2, 1)
+    # Середина ленты: курсором, как листают её ссылки пагинатора, и
+    # запасным ?page= с OFFSET.
+    deep_post = Post.objects.order_by('-created', '-pk')[
+        (deep_page - 1) * PAGINATOR_LIMIT:
+    ].first()
+    pages = {
+        'index': (reverse('posts:index'), None),
+        'index_deep': (
+            f'{reverse("posts:index")}?{CURSOR_PARAM}='
+            f'{encode_cursor(deep_post, CURSOR_NEXT)}',
+            None,
+        ),
+        'index_deep_page': (
+            f'{reverse("posts:index")}?{PAGE_PARAM}={deep_page}', None
+        ),
+        'profile': (
+            reverse('posts:profile', args=[author.username]), None
+        ),
+        'post_detail': (
+            reverse('posts:post_detail', args=[
+                commented['post_id'] if commented else post.pk
+            ]),
+            None,
+        ),
+        'follow_index': (reverse('posts:follow_index'), reader),
+        'search': (f'{reverse("posts:search")}?q=город', None),
+    }
+    if group is not None:
+        pages['group_posts'] = (
+            reverse('posts:group_posts', args=[group.slug]), None
+        )
+    return pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет страницы posts: перцентили времени ответа, число '
+        'запросов к БД и пиковое потребление памяти. Сохраняет отчёт '
+        'в JSON и сравнивает его с эталонным.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Количество замеряемых запросов к каждой странице.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Количество запросов перед замерами.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчёта.')
+        parser.add_argument('--baseline', help='Эталонный JSON-отчёт.')
+        parser.add_argument(
+            '--threshold', type=float, default=1.25,
+            help='Во сколько раз метрика может превысить эталон.'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершаться с ошибкой при ухудшении относительно эталона.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть положительным.')
+        pages = benchmark_pages()
+        if not pages:
+            raise CommandError(
+                'В базе нет постов; заполните её командой seed_data.'
+            )
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'posts': Post.objects.count(),
+                'users': User.objects.count(),
+            },
+            'views': {},
+        }
+        for name, (url, user) in pages.items():
+            report['views'][name] = self.measure(url, user, options)
+            self.print_view(name, report['views'][name])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Отчёт сохранён в {options["output"]}.')
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+            regressions = self.compare(
+                report, baseline, options['threshold']
+            )
+            if regressions and options['fail_on_regression']:
+                raise CommandError(
+                    f'Ухудшение относительно эталона: {regressions}.'
+                )
+
+    def measure(self, url, user, options):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        for _ in range(options['warmup']):
+            client.get(url)
+        timings = []
+        queries = []
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        if options['cold']:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            client.get(url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p90_ms': round(percentile(timings, 90), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': max(queries),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def print_view(self, name, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{name} ({result["url"]}, HTTP {result["status"]})'
+        ))
+        self.stdout.write(
+            f'  p50 {result["p50_ms"]} мс, p90 {result["p90_ms"]} мс, '
+            f'p99 {result["p99_ms"]} мс; запросов к БД: '
+            f'{result["queries"]}; пик памяти: {result["peak_kib"]} КиБ'
+        )
+
+    def compare(self, report, baseline, threshold):
+        """Печатает сравнение с эталоном и возвращает список ухудшений."""
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING('Сравнение с эталоном'))
+        for name, result in report['views'].items():
+            expected = baseline.get('views', {}).get(name)
+            if expected is None:
+                self.stdout.write(f'  {name}: нет в эталоне')
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = expected[metric], result[metric]
+                if metric == 'queries':
+                    worse = after > before
+                else:
+                    worse = after > before * threshold
+                ratio = f'×{after / before:.2f}' if before else '—'
+                line = f'  {name}.{metric}: {before} → {after} ({ratio})'
+                if worse:
+                    regressions.append(f'{name}.{metric}')
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Ухудшений нет.'))
+        return regressions
@@ -0,0 +1,118 @@
+import base64
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в формате NDJSON: по одной JSON-записи на строку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Файл для выгрузки; «-» — стандартный вывод.'
+        )
+        parser.add_argument(
+            '--with-images',
+            action='store_true',
+            help='Вкладывать содержимое картинок в base64.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество строк, читаемых из БД за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        self.chunk_size = options['chunk_size']
+        self.with_images = options['with_images']
+        if options['output'] == '-':
+            self.export(sys.stdout)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                self.export(stream)
+
+    def export(self, stream):
+        sources = (
+            ('user', self.users()),
+            ('group', self.groups()),
+            ('post', self.posts()),
+            ('comment', self.comments()),
+            ('follow', self.follows()),
+        )
+        for kind, records in sources:
+            written = 0
+            for record in records:
+                record['type'] = kind
+                stream.write(json.dumps(record, ensure_ascii=False))
+                stream.write('\n')
+                written += 1
+                if written % self.chunk_size == 0:
+                    self.progress(kind, written)
+            self.progress(kind, written)
+
+    def progress(self, kind, written):
+        self.stderr.write(f'{kind}: выгружено {written}')
+
+    def rows(self, queryset, **fields):
+        """Строки queryset как словари с ключами из fields."""
+        rows = queryset.order_by('pk').values_list(*fields.values())
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            yield dict(zip(fields, row))
+
+    def users(self):
+        yield from self.rows(
+            User.objects.all(), username='username',
+            first_name='first_name', last_name='last_name'
+        )
+
+    def groups(self):
+        yield from self.rows(
+            Group.objects.all(), id='id', title='title', slug='slug',
+            description='description'
+        )
+
+    def posts(self):
+        storage = Post.image.field.storage
+        rows = self.rows(
+            Post.objects.all(), id='id', author='author__username',
+            group='group_id', text='text', created='created',
+            updated='updated', image='image', image_width='image_width',
+            image_height='image_height'
+        )
+        for row in rows:
+            row['created'] = row['created'].isoformat()
+            row['updated'] = row['updated'].isoformat()
+            if self.with_images and row['image']:
+                try:
+                    with storage.open(row['image']) as image:
+                        row['image_data'] = base64.b64encode(
+                            image.read()
+                        ).decode()
+                except OSError:
+                    self.stderr.write(
+                        f'Не удалось прочитать картинку {row["image"]}'
+                    )
+            yield row
+
+    def comments(self):
+        rows = self.rows(
+            Comment.objects.all(), id='id', post='post_id',
+            author='author__username', text='text', created='created'
+        )
+        for row in rows:
+            row['created'] = row['created'].isoformat()
+            yield row
+
+    def follows(self):
+        yield from self.rows(
+            Follow.objects.all(), user='user__username',
+            author='author__username'
+        )
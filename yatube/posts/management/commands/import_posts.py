@@ -0,0 +1,261 @@
+import base64
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from posts import caching, timeline
+from posts.models import Comment, Follow, Group, ImageBlob, Post, User
+
+from ._bulk import bulk_create_dated
+
+KINDS = ('user', 'group', 'post', 'comment', 'follow')
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_posts. Записи вставляются пачками через '
+        'bulk_create, после чего пересчитываются счётчики, ленты подписок '
+        'и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='Файл выгрузки; «-» — стандартный ввод.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество записей, вставляемых в одной транзакции.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                'Файл с прогрессом импорта. Если он существует, импорт '
+                'продолжается с первой незагруженной строки.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.checkpoint = options['checkpoint']
+        self.state = self.load_state()
+        self.buffers = {kind: [] for kind in KINDS}
+        self.totals = dict.fromkeys(KINDS, 0)
+        started = time.monotonic()
+        if options['input'] == '-':
+            self.load(sys.stdin)
+        else:
+            with open(options['input'], encoding='utf-8') as stream:
+                self.load(stream)
+        self.finish()
+        totals = ', '.join(f'{k}: {v}' for k, v in self.totals.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён за {time.monotonic() - started:.1f} с '
+            f'({totals}).'
+        ))
+
+    def load_state(self):
+        """
+        Состояние импорта: последняя загруженная строка, соответствие
+        групп и сдвиги первичных ключей.
+
+        Посты и комментарии получают ключи «исходный id + сдвиг», поэтому
+        повторная загрузка пачки после сбоя ничего не дублирует.
+        """
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding='utf-8') as stream:
+                state = json.load(stream)
+            self.stdout.write(f'Продолжение со строки {state["line"] + 1}.')
+            return state
+        return {
+            'line': 0,
+            'groups': {},
+            'post_offset': Post.objects.aggregate(pk=Max('pk'))['pk'] or 0,
+            'comment_offset': (
+                Comment.objects.aggregate(pk=Max('pk'))['pk'] or 0
+            ),
+        }
+
+    def save_state(self):
+        if not self.checkpoint:
+            return
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(self.state, stream)
+        os.replace(temporary, self.checkpoint)
+
+    def load(self, stream):
+        pending = 0
+        line_number = 0
+        for line_number, line in enumerate(stream, start=1):
+            if line_number <= self.state['line'] or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                self.buffers[record.pop('type')].append(record)
+            except (ValueError, KeyError) as error:
+                raise CommandError(
+                    f'Строка {line_number}: некорректная запись ({error}).'
+                )
+            pending += 1
+            if pending == self.batch_size:
+                self.flush(line_number)
+                pending = 0
+        if pending:
+            self.flush(line_number)
+
+    def flush(self, line_number):
+        with transaction.atomic():
+            users = self.import_users()
+            self.import_groups()
+            self.import_posts(users)
+            self.import_comments(users)
+            self.import_follows(users)
+        for kind, records in self.buffers.items():
+            self.totals[kind] += len(records)
+            records.clear()
+        self.state['line'] = line_number
+        self.save_state()
+        self.stdout.write(f'Загружено строк: {line_number}.')
+
+    def import_users(self):
+        """Возвращает id пользователей пачки, создавая недостающих."""
+        records = {
+            record['username']: record for record in self.buffers['user']
+        }
+        usernames = set(records)
+        for kind, fields in (
+            ('post', ('author',)),
+            ('comment', ('author',)),
+            ('follow', ('user', 'author')),
+        ):
+            for record in self.buffers[kind]:
+                usernames.update(record[field] for field in fields)
+        users = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'pk')
+        )
+        missing = usernames - set(users)
+        if missing:
+            User.objects.bulk_create(
+                User(
+                    username=username,
+                    first_name=records.get(username, {}).get('first_name', ''),
+                    last_name=records.get(username, {}).get('last_name', ''),
+                    password=make_password(None),
+                )
+                for username in missing
+            )
+            users.update(
+                User.objects.filter(username__in=missing)
+                .values_list('username', 'pk')
+            )
+        return users
+
+    def import_groups(self):
+        records = self.buffers['group']
+        if not records:
+            return
+        slugs = {record['slug'] for record in records}
+        existing = set(
+            Group.objects.filter(slug__in=slugs).values_list('slug', flat=True)
+        )
+        Group.objects.bulk_create(
+            Group(
+                title=record['title'],
+                slug=record['slug'],
+                description=record['description'],
+            )
+            for record in records
+            if record['slug'] not in existing
+        )
+        group_ids = dict(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+        )
+        for record in records:
+            self.state['groups'][str(record['id'])] = group_ids[record['slug']]
+
+    def save_image(self, record):
+        """Сохраняет вложенную картинку и возвращает её имя в хранилище."""
+        field = Post.image.field
+        name = field.generate_filename(None, os.path.basename(record['image']))
+        content = ContentFile(base64.b64decode(record['image_data']))
+        return field.storage.save(name, content)
+
+    def import_posts(self, users):
+        offset = self.state['post_offset']
+        posts = []
+        for record in self.buffers['post']:
+            created = parse_datetime(record['created'])
+            image = record['image']
+            if record.get('image_data'):
+                image = self.save_image(record)
+            posts.append(Post(
+                pk=record['id'] + offset,
+                author_id=users[record['author']],
+                group_id=self.state['groups'].get(str(record['group'])),
+                text=record['text'],
+                created=created,
+                updated=parse_datetime(record.get('updated') or '') or created,
+                image=image,
+                image_width=record['image_width'],
+                image_height=record['image_height'],
+            ))
+        bulk_create_dated(Post, posts, ignore_conflicts=True)
+
+    def import_comments(self, users):
+        bulk_create_dated(
+            Comment,
+            (
+                Comment(
+                    pk=record['id'] + self.state['comment_offset'],
+                    post_id=record['post'] + self.state['post_offset'],
+                    author_id=users[record['author']],
+                    text=record['text'],
+                    created=parse_datetime(record['created']),
+                )
+                for record in self.buffers['comment']
+            ),
+            ignore_conflicts=True,
+        )
+
+    def import_follows(self, users):
+        Follow.objects.bulk_create(
+            (
+                Follow(
+                    user_id=users[record['user']],
+                    author_id=users[record['author']],
+                )
+                for record in self.buffers['follow']
+            ),
+            ignore_conflicts=True,
+        )
+
+    def finish(self):
+        """Восстанавливает то, что при bulk_create делают сигналы."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        for command in ('rebuild_user_stats', 'rebuild_search_index'):
+            call_command(command, stdout=self.stdout)
+        timeline.backfill_all()
+        Post.objects.rebuild_comments_count()
+        ImageBlob.objects.rebuild()
+        caching.bump_feeds(caching.ALL_FEEDS)
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает материализованные ленты подписок по таблице Follow: '
+        'удаляет лишние записи и добавляет недостающие.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            pruned = timeline.prune_stale()
+            added = timeline.backfill_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {pruned}, добавлено: {added}.'
+        ))
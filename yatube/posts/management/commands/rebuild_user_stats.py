@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User, UserStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество пользователей, обрабатываемых за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = (
+            User.objects.order_by('pk')
+            .values_list('pk', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+        processed = fixed = 0
+        batch = []
+        for user_id in user_ids:
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                fixed += UserStats.objects.rebuild(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            fixed += UserStats.objects.rebuild(batch)
+            processed += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено пользователей: {processed}, исправлено: {fixed}.'
+        ))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ._seed import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу воспроизводимым набором данных для нагрузочных '
+        'замеров: пользователи, группы, посты, комментарии и подписки '
+        'с неравномерным распределением популярности авторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель закона Ципфа для популярности авторов.'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Зерно генератора; одинаковое зерно даёт одинаковые данные.'
+        )
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            seed=options['seed'],
+            skew=options['skew'],
+            log=self.stdout.write,
+        )
+        if seeder.usernames_taken():
+            raise CommandError(
+                f'Набор данных {seeder.prefix} уже загружен; '
+                'укажите другое значение --seed.'
+            )
+        seeder.run(
+            options['users'],
+            options['groups'],
+            options['posts'],
+            comments_num=options['comments'],
+            follows_per_user=options['follows'],
+        )
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+            'post_id UNINDEXED, text, comment, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Совпадение в тексте поста весит вдвое больше, чем в комментарии.
+        cursor.execute(
+            'INSERT INTO posts_search (posts_search, rank) '
+            "VALUES ('rank', 'bm25(0.0, 2.0, 1.0)')"
+        )
+        cursor.execute(
+            'INSERT INTO posts_search (rowid, post_id, text, comment) '
+            "SELECT 2 * id, id, text, '' FROM posts_post"
+        )
+        cursor.execute(
+            'INSERT INTO posts_search (rowid, post_id, text, comment) '
+            "SELECT 2 * id + 1, post_id, '', text FROM posts_comment"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
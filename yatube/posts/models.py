@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from core.models import CreatedModel
 from .constants import POST_LIMIT
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -11,12 +15,60 @@ class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='заголовок')
     slug = models.SlugField(unique=True, verbose_name='адрес страницы')
     description = models.TextField(verbose_name='описание')
+    modified = models.DateTimeField(
+        'дата изменения', auto_now=True, editable=False
+    )
 
     def __str__(self):
         return self.title
 
 
-class Post(CreatedModel):
+class CountedModel(models.Model):
+    """
+    Абстрактная модель, от которой зависят денормализованные счётчики.
+
+    save() выполняется в одной транзакции с обработчиками post_save,
+    которые меняют счётчики: если одно из них не удалось, откатывается
+    и другое. Удаление Django и так проводит в транзакции вместе с
+    обработчиками post_delete.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты вместе с автором и группой для карточек в ленте."""
+        return self.select_related('author', 'group')
+
+    def rebuild_comments_count(self):
+        """
+        Пересчитывает comments_count по таблице комментариев.
+
+        Нужен после массовых операций, которые обходят сигналы.
+        Возвращает количество обработанных постов.
+        """
+        totals = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.update(comments_count=Coalesce(
+            Subquery(totals, output_field=IntegerField()), 0
+        ))
+
+
+class Post(CountedModel, CreatedModel):
     text = models.TextField(verbose_name='текст')
     author = models.ForeignKey(
         User,
@@ -36,19 +88,137 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'высота картинки', null=True, blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'количество комментариев', default=0, editable=False
+    )
+    updated = models.DateTimeField('дата изменения', auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-created'], name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', '-created'], name='post_group_created_idx'
+            ),
+            models.Index(fields=['updated'], name='post_updated_idx'),
+        ]
 
     def __str__(self):
         return self.text[:POST_LIMIT]
 
 
-class Comment(CreatedModel):
+class ImageBlobManager(models.Manager):
+    def acquire(self, name):
+        """
+        Учитывает ещё одну ссылку на файл.
+
+        Отслеживаются только файлы, сохранённые хранилищем по содержимому:
+        старые загрузки и пути, заданные вручную, никогда не удаляются.
+        """
+        if not ContentAddressedStorage.is_content_addressed(name):
+            return
+        # Сначала UPDATE: он блокирует существующую запись, и её не
+        # удалит thumbnails.delete_unreferenced.
+        blobs = self.filter(name=name)
+        with transaction.atomic():
+            if blobs.update(refcount=F('refcount') + 1):
+                return
+            blob, created = self.get_or_create(name=name)
+            if not created:
+                blobs.update(refcount=F('refcount') + 1)
+
+    def release(self, name):
+        """
+        Снимает ссылку на файл.
+
+        Возвращает True, если ссылок не осталось. Запись с нулём ссылок
+        остаётся до thumbnails.delete_unreferenced, которую нужно вызвать
+        после коммита.
+        """
+        blobs = self.filter(name=name)
+        blobs.filter(refcount__gt=0).update(refcount=F('refcount') - 1)
+        return blobs.filter(refcount=0).exists()
+
+    def recount(self, names):
+        """
+        Пересчитывает ссылки на файлы names по таблице постов.
+
+        Возвращает имена файлов, на которые больше никто не ссылается.
+        """
+        names = set(names)
+        refs = dict(
+            Post.objects.filter(image__in=names)
+            .order_by()
+            .values('image')
+            .annotate(refcount=Count('pk'))
+            .values_list('image', 'refcount')
+        )
+        for name, refcount in refs.items():
+            self.filter(name=name).update(refcount=refcount)
+        orphaned = names - set(refs)
+        self.filter(name__in=orphaned).update(refcount=0)
+        return {
+            name for name in orphaned
+            if ContentAddressedStorage.is_content_addressed(name)
+        }
+
+    def rebuild(self):
+        """
+        Пересчитывает ссылки по таблице постов.
+
+        Нужен после массовых операций, которые обходят сигналы.
+        Возвращает количество отслеживаемых файлов.
+        """
+        refs = (
+            Post.objects.exclude(image='')
+            .order_by()
+            .values('image')
+            .annotate(refcount=Count('pk'))
+        )
+        blobs = [
+            self.model(name=ref['image'], refcount=ref['refcount'])
+            for ref in refs
+            if ContentAddressedStorage.is_content_addressed(ref['image'])
+        ]
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(blobs)
+        return len(blobs)
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(
+        'имя файла', max_length=255, unique=True
+    )
+    refcount = models.PositiveIntegerField('число ссылок', default=1)
+
+    objects = ImageBlobManager()
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class Comment(CountedModel, CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -67,9 +237,14 @@ class Comment(CreatedModel):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx'
+            ),
+        ]
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -87,3 +262,144 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='unique_follow')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class UserStatsManager(models.Manager):
+    def for_user(self, user):
+        """
+        Счётчики пользователя.
+
+        Если записи нет, счётчики считаются по исходным таблицам, но
+        запись не создаётся: её строят create_user_stats и команда
+        rebuild_user_stats.
+        """
+        try:
+            return user.stats
+        except self.model.DoesNotExist:
+            return self.model(
+                user=user,
+                modified=user.date_joined,
+                **self.compute([user.pk])[user.pk]
+            )
+
+    def compute(self, user_ids):
+        """Счётчики пользователей по исходным таблицам."""
+        counters = {
+            user_id: dict.fromkeys(self.model.COUNTER_FIELDS, 0)
+            for user_id in user_ids
+        }
+        sources = (
+            (Post, 'author_id', 'posts_count'),
+            (Comment, 'author_id', 'comments_count'),
+            (Follow, 'author_id', 'followers_count'),
+            (Follow, 'user_id', 'following_count'),
+        )
+        for model, field, counter in sources:
+            rows = (
+                model.objects
+                .filter(**{f'{field}__in': user_ids})
+                .order_by()
+                .values(field)
+                .annotate(total=Count('pk'))
+            )
+            for row in rows:
+                counters[row[field]][counter] = row['total']
+        return counters
+
+    def rebuild(self, user_ids):
+        """
+        Пересчитывает счётчики пользователей по исходным таблицам.
+
+        Возвращает количество созданных или исправленных записей.
+        """
+        user_ids = list(user_ids)
+        counters = self.compute(user_ids)
+        existing = self.in_bulk(user_ids)
+        to_create = []
+        to_update = []
+        for user_id, values in counters.items():
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(self.model(user_id=user_id, **values))
+            elif any(getattr(stats, k) != v for k, v in values.items()):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        now = timezone.now()
+        for stats in to_update:
+            stats.modified = now
+        with transaction.atomic():
+            self.bulk_create(to_create, ignore_conflicts=True)
+            self.bulk_update(
+                to_update, self.model.COUNTER_FIELDS + ('modified',)
+            )
+        return len(to_create) + len(to_update)
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    COUNTER_FIELDS = (
+        'posts_count', 'comments_count', 'followers_count', 'following_count'
+    )
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='количество постов'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name='количество комментариев'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='количество подписок'
+    )
+    modified = models.DateTimeField(
+        'дата изменения', auto_now=True, editable=False
+    )
+
+    objects = UserStatsManager()
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry')
+        ]
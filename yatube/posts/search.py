@@ -0,0 +1,289 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд выбирается настройкой SEARCH_BACKEND. На SQLite с FTS5 поиск идёт
+по инвертированному индексу posts_search с ранжированием bm25, на прочих
+СУБД — по LIKE-запросам без ранжирования. Индекс обновляется сигналами
+при сохранении и удалении постов и комментариев.
+"""
+import base64
+import binascii
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .constants import PAGINATOR_LIMIT, SEARCH_MAX_TOKENS
+from .models import Comment, Post
+from .utils import (
+    CURSOR_NEXT, CURSOR_PREVIOUS, CursorPaginator, cursor_page
+)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(query):
+    """Разбивает запрос на слова без операторов языка запросов."""
+    return TOKEN_RE.findall(query.lower())[:SEARCH_MAX_TOKENS]
+
+
+class LikeBackend:
+    """Поиск подстрокой; работает на любой СУБД, но без индекса."""
+
+    @classmethod
+    def is_supported(cls, connection):
+        return True
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment):
+        pass
+
+    def remove_many(self, post_ids=(), comment_ids=()):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _filter(self, queryset, query):
+        for token in tokenize(query):
+            queryset = queryset.filter(text__icontains=token)
+        return queryset
+
+    def filter_posts(self, queryset, query):
+        """Посты queryset, в тексте которых есть все слова запроса."""
+        return self._filter(queryset, query)
+
+    def filter_comments(self, queryset, query):
+        """Комментарии queryset, в тексте которых есть все слова запроса."""
+        return self._filter(queryset, query)
+
+    def search(self, query, cursor=None, per_page=PAGINATOR_LIMIT):
+        tokens = tokenize(query)
+        if not tokens:
+            return cursor_page([], per_page)
+        posts = Post.objects.feed()
+        for token in tokens:
+            commented = Comment.objects.filter(
+                text__icontains=token
+            ).values('post_id')
+            posts = posts.filter(
+                Q(text__icontains=token) | Q(pk__in=commented)
+            )
+        return CursorPaginator(posts, per_page).get_page(cursor)
+
+
+def encode_cursor(direction, score, post_id):
+    raw = f'{direction}|{score!r}|{post_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для некорректного токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, score, post_id = raw.decode().split('|')
+        score = float(score)
+        post_id = int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        return None
+    return direction, score, post_id
+
+
+class Fts5Backend:
+    """
+    Поиск по таблице FTS5 posts_search.
+
+    Пост и каждый его комментарий — отдельные документы индекса:
+    rowid поста равен 2 * id, комментария — 2 * id + 1. Совпадение в тексте
+    поста весит вдвое больше, чем в комментарии (см. миграцию 0019).
+    Результаты упорядочены по лучшей оценке документа поста и листаются
+    курсором по паре (оценка, id поста).
+    """
+    table = 'posts_search'
+    # Не больше стольких параметров в одном запросе.
+    batch_size = 500
+    _supported = {}
+
+    @classmethod
+    def is_supported(cls, connection):
+        if connection.vendor != 'sqlite':
+            return False
+        if connection.alias not in cls._supported:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+                )
+                cls._supported[connection.alias] = bool(cursor.fetchone()[0])
+        return cls._supported[connection.alias]
+
+    def _replace(self, rowid, post_id, text='', comment=''):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [rowid]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, post_id, text, comment) '
+                'VALUES (%s, %s, %s, %s)',
+                [rowid, post_id, text, comment],
+            )
+
+    def _delete(self, rowid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [rowid]
+            )
+
+    def index_post(self, post):
+        self._replace(2 * post.pk, post.pk, text=post.text)
+
+    def remove_post(self, post):
+        self._delete(2 * post.pk)
+
+    def index_comment(self, comment):
+        self._replace(
+            2 * comment.pk + 1, comment.post_id, comment=comment.text
+        )
+
+    def remove_comment(self, comment):
+        self._delete(2 * comment.pk + 1)
+
+    def remove_many(self, post_ids=(), comment_ids=()):
+        """Удаляет из индекса документы постов и комментариев по id."""
+        rowids = [2 * pk for pk in post_ids]
+        rowids += [2 * pk + 1 for pk in comment_ids]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rowids), self.batch_size):
+                batch = rowids[start:start + self.batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'DELETE FROM {self.table} '
+                    f'WHERE rowid IN ({placeholders})',
+                    batch,
+                )
+
+    def rebuild(self):
+        """Перестраивает индекс целиком; возвращает число документов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, post_id, text, comment) '
+                f"SELECT 2 * id, id, text, '' FROM {Post._meta.db_table}"
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, post_id, text, comment) '
+                f"SELECT 2 * id + 1, post_id, '', text "
+                f'FROM {Comment._meta.db_table}'
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')"
+            )
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _match(tokens, column=None):
+        match = ' '.join(f'"{token}"' for token in tokens)
+        return f'{column} : ({match})' if column else match
+
+    def filter_posts(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT post_id FROM {self.table} WHERE {self.table} MATCH %s',
+            [self._match(tokens, 'text')],
+        ))
+
+    def filter_comments(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT (rowid - 1) / 2 FROM {self.table} '
+            f'WHERE {self.table} MATCH %s',
+            [self._match(tokens, 'comment')],
+        ))
+
+    def _hits(self, match, position, per_page):
+        sql = (
+            f'SELECT post_id, MIN(rank) AS score FROM {self.table} '
+            f'WHERE {self.table} MATCH %s GROUP BY post_id'
+        )
+        params = [match]
+        backwards = position is not None and position[0] == CURSOR_PREVIOUS
+        if position is not None:
+            _, score, post_id = position
+            if backwards:
+                sql += ' HAVING score < %s OR (score = %s AND post_id > %s)'
+            else:
+                sql += ' HAVING score > %s OR (score = %s AND post_id < %s)'
+            params += [score, score, post_id]
+        if backwards:
+            sql += ' ORDER BY score DESC, post_id ASC LIMIT %s'
+        else:
+            sql += ' ORDER BY score ASC, post_id DESC LIMIT %s'
+        params.append(per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            hits = cursor.fetchall()
+        has_more = len(hits) > per_page
+        hits = hits[:per_page]
+        if backwards:
+            hits.reverse()
+        return hits, has_more
+
+    def search(self, query, cursor=None, per_page=PAGINATOR_LIMIT):
+        tokens = tokenize(query)
+        if not tokens:
+            return cursor_page([], per_page)
+        match = self._match(tokens)
+        position = decode_cursor(cursor)
+        hits, has_more = self._hits(match, position, per_page)
+        if not hits and position is not None:
+            position = None
+            hits, has_more = self._hits(match, None, per_page)
+        posts = Post.objects.feed().in_bulk([post_id for post_id, _ in hits])
+        backwards = position is not None and position[0] == CURSOR_PREVIOUS
+        has_next = has_more if not backwards else True
+        has_previous = position is not None and (has_more or not backwards)
+        return cursor_page(
+            [posts[post_id] for post_id, _ in hits if post_id in posts],
+            per_page,
+            next_cursor=(
+                encode_cursor(CURSOR_NEXT, hits[-1][1], hits[-1][0])
+                if has_next and hits else None
+            ),
+            previous_cursor=(
+                encode_cursor(CURSOR_PREVIOUS, hits[0][1], hits[0][0])
+                if has_previous and hits else None
+            ),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)
+
+
+def get_backend():
+    """Возвращает бэкенд из настроек или LIKE-поиск, если он недоступен."""
+    backend_class = _load_backend(settings.SEARCH_BACKEND)
+    if not backend_class.is_supported(connection):
+        backend_class = LikeBackend
+    return backend_class()
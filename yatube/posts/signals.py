@@ -0,0 +1,222 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, search, thumbnails, timeline
+from .models import Comment, Follow, Group, ImageBlob, Post, User, UserStats
+
+# Поля пользователя, которые выводятся в карточках постов.
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def change_stats(user_id, **deltas):
+    """
+    Изменяет счётчики пользователя на заданные величины одним UPDATE.
+
+    Выполняется в транзакции сохранения или удаления объекта (см.
+    CountedModel). Запись создаётся вместе с пользователем; недостающие
+    строит команда rebuild_user_stats.
+    """
+    counters = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+    UserStats.objects.filter(pk=user_id).update(
+        modified=timezone.now(), **counters
+    )
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_stats(instance.author_id, posts_count=-1)
+
+
+def change_comments_count(post_id, delta):
+    """Меняет счётчик комментариев; страница поста считается изменённой."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0),
+        updated=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, comments_count=1)
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_stats(instance.author_id, comments_count=-1)
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, followers_count=1)
+        change_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    was_fan_out = timeline.is_fan_out_author(instance.author_id)
+    change_stats(instance.author_id, followers_count=-1)
+    change_stats(instance.user_id, following_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    # Автор перестал быть «крупным»: его посты снова нужно раскладывать.
+    if not was_fan_out and timeline.is_fan_out_author(instance.author_id):
+        timeline.backfill_author(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    # Новый файл ещё не сохранён: ссылку на него возьмёт хранилище.
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+    if instance.pk and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image')
+            .first()
+        ) or (None, '')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    caching.bump_version(caching.POST, instance.pk)
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None)
+    }
+    caching.bump_feeds(
+        caching.index_scope(),
+        caching.profile_scope(instance.author_id),
+        *(caching.group_scope(pk) for pk in group_ids if pk is not None)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_feeds(sender, instance, **kwargs):
+    """Обновляет даты изменения лент группы и автора для Last-Modified."""
+    now = timezone.now()
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None)
+    }
+    Group.objects.filter(pk__in=group_ids - {None}).update(modified=now)
+    UserStats.objects.filter(pk=instance.author_id).update(modified=now)
+
+
+def release_image(name):
+    """Снимает ссылку на файл и удаляет его, когда ссылок не осталось."""
+    if name and ImageBlob.objects.release(name):
+        transaction.on_commit(lambda: thumbnails.delete_unreferenced(name))
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = '' if created else getattr(instance, '_previous_image', '')
+    current = instance.image.name or ''
+    if getattr(instance, '_image_uploaded', False):
+        # Ссылку на загруженный файл уже взял ContentAddressedStorage.save.
+        instance._image_uploaded = False
+    elif current == previous:
+        return
+    elif current:
+        ImageBlob.objects.acquire(current)
+    release_image(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.get_backend().remove_comment(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_names(sender, instance, raw=False, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or raw:
+        return
+    if update_fields is not None and set(update_fields).isdisjoint(
+        CARD_USER_FIELDS
+    ):
+        return
+    instance._previous_names = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*CARD_USER_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cache(sender, instance, created, raw=False, **kwargs):
+    """Карточки и ленты зависят только от имени автора."""
+    previous = instance.__dict__.pop('_previous_names', None)
+    if created or raw or previous is None:
+        return
+    if previous == tuple(getattr(instance, f) for f in CARD_USER_FIELDS):
+        return
+    caching.bump_version(caching.USER, instance.pk)
+    caching.bump_feeds(caching.ALL_FEEDS)
+    UserStats.objects.filter(pk=instance.pk).update(modified=timezone.now())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cache(sender, instance, **kwargs):
+    caching.bump_version(caching.GROUP, instance.pk)
+    caching.bump_feeds(caching.ALL_FEEDS)
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import re
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище с адресацией по содержимому.
+
+    Файл сохраняется под именем <каталог>/<ab>/<sha256><расширение>,
+    поэтому одинаковые загрузки хранятся один раз, а sorl-thumbnail
+    строит для них общие миниатюры. Учёт ссылок ведёт модель ImageBlob:
+    save сразу берёт ссылку на сохранённый файл.
+    """
+    name_re = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$')
+
+    @classmethod
+    def is_content_addressed(cls, name):
+        return bool(name) and cls.name_re.search(name) is not None
+
+    @staticmethod
+    def content_hash(content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = self.content_hash(content)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], f'{digest}{extension}')
+        name = name.replace('\\', '/')
+        # Ссылка берётся до проверки файла и в той же транзакции: запись
+        # ImageBlob блокируется, и удаление файла без ссылок
+        # (thumbnails.delete_unreferenced) не может пройти между проверкой
+        # и сохранением поста.
+        with transaction.atomic():
+            apps.get_model('posts', 'ImageBlob').objects.acquire(name)
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length=max_length)
@@ -0,0 +1,48 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+from posts.caching import post_card_key
+from posts.constants import (
+    DEFAULT_IMAGE_VARIANT, IMAGE_SIZES, POST_CARD_CACHE_TIMEOUT
+)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post, show_group_link=True):
+    """Карточка поста, закэшированная по версиям поста, автора и группы."""
+    key = post_card_key(post, show_group_link)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'posts/includes/post_card.html',
+            {'post': post, 'show_group_link': show_group_link},
+        )
+        cache.set(key, html, POST_CARD_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, lazy=True):
+    """Картинка поста со srcset по готовым вариантам."""
+    variants = thumbnails.get_ready_variants(post)
+    if not variants:
+        width, height = thumbnails.display_size(post)
+        return {'post': post, 'width': width, 'height': height}
+    default = variants.get(DEFAULT_IMAGE_VARIANT)
+    if default is None:
+        default = list(variants.values())[-1]
+    return {
+        'post': post,
+        'lazy': lazy,
+        'image': default,
+        'srcset': ', '.join(
+            f'{thumbnail.url} {thumbnail.width}w'
+            for thumbnail in variants.values()
+        ),
+        'sizes': IMAGE_SIZES,
+    }
@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.admin import EstimatedCountPaginator
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class AdminTests(TestCase):
+    """Тестирование списков админки на больших таблицах."""
+    POSTS_NUM = 5
+    ROWS_ADDED = 45
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='test_slug', description='Описание.'
+        )
+        for i in range(cls.POSTS_NUM):
+            post = Post.objects.create(
+                author=cls.admin, group=cls.group, text=f'Пост номер {i}'
+            )
+            Comment.objects.create(
+                post=post, author=cls.admin, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(
+            user=User.objects.create_user(username='reader'), author=cls.admin
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model._meta.model_name}_changelist')
+        self.admin_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def add_rows(self, count):
+        """Добавляет count постов, комментариев и подписок."""
+        Post.objects.bulk_create(
+            Post(author=self.admin, group=self.group, text=f'Ещё пост {i}')
+            for i in range(count)
+        )
+        posts = Post.objects.filter(text__startswith='Ещё пост')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.admin, text='Ещё комментарий')
+            for post in posts
+        )
+        User.objects.bulk_create(
+            User(username=f'reader{i}') for i in range(count)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=self.admin)
+            for user in User.objects.filter(username__startswith='reader')
+            .exclude(username='reader')
+        )
+
+    def test_changelists_query_count(self):
+        """Число запросов списка не зависит от числа строк."""
+        budgets = {Post: 7, Comment: 7, Follow: 5}
+        few = {model: self.changelist_queries(model) for model in budgets}
+        self.add_rows(self.ROWS_ADDED)
+        self.assertEqual(
+            Post.objects.count(), self.POSTS_NUM + self.ROWS_ADDED
+        )
+        many = {model: self.changelist_queries(model) for model in budgets}
+        self.assertEqual(few, budgets)
+        self.assertEqual(many, few)
+
+    def test_group_action_uses_autocomplete(self):
+        """Форма действий не выводит список всех групп."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist')
+        )
+        field = str(response.context['action_form']['group'])
+        self.assertIn(reverse('admin:posts_group_autocomplete'), field)
+        self.assertNotIn(f'value="{self.group.pk}"', field)
+
+    def test_search_uses_backend(self):
+        """Поиск в админке находит посты и комментарии по словам."""
+        cases = (
+            ('admin:posts_post_changelist', 'номер 3', 'Пост номер 3'),
+            ('admin:posts_comment_changelist', 'Комментарий 2',
+             'Комментарий 2'),
+        )
+        for name, query, text in cases:
+            with self.subTest(query=query):
+                response = self.admin_client.get(
+                    reverse(name), {'q': query}
+                )
+                objects = list(response.context['cl'].result_list)
+                self.assertEqual([obj.text for obj in objects], [text])
+
+    def test_estimated_count(self):
+        """Для таблицы без фильтров берётся оценка из статистики."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with mock.patch('posts.admin.ADMIN_EXACT_COUNT_LIMIT', 2):
+            unfiltered = EstimatedCountPaginator(Post.objects.all(), 10)
+            filtered = EstimatedCountPaginator(
+                Post.objects.filter(group=self.group), 10
+            )
+            self.assertEqual(unfiltered.count, self.POSTS_NUM)
+            self.assertEqual(filtered.count, 3)
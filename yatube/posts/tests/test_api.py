@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    """Тестирование JSON API и условных запросов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test_slug', description='Описание.'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст поста.'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий.'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_endpoints(self):
+        """Эндпоинты отдают посты и комментарии в JSON."""
+        feeds = (
+            (self.client, reverse('posts:api_index')),
+            (
+                self.client,
+                reverse('posts:api_group_posts', args=['test_slug'])
+            ),
+            (self.client, reverse('posts:api_profile', args=['author'])),
+            (self.reader_client, reverse('posts:api_follow_index')),
+        )
+        for client, url in feeds:
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(
+                    [post['id'] for post in data['posts']], [self.post.pk]
+                )
+                self.assertEqual(data['posts'][0]['group'], 'test_slug')
+                self.assertIsNone(data['next'])
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk])
+        ).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], 1)
+        data = self.client.get(
+            reverse('posts:api_post_comments', args=[self.post.pk])
+        ).json()
+        self.assertEqual(data['comments'][0]['author'], 'reader')
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок недоступна анониму."""
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_etag_not_modified_without_queries(self):
+        """Совпавший ETag ленты даёт 304 без запросов к БД."""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes_with_content(self):
+        """После изменения поста и комментариев ETag меняется."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_posts', args=['test_slug']),
+            reverse('posts:api_profile', args=['author']),
+            reverse('posts:api_post_detail', args=[self.post.pk]),
+            reverse('posts:api_post_comments', args=[self.post.pk]),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст.'
+        post.save()
+        Comment.objects.create(post=post, author=self.author, text='Ещё.')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_last_modified_does_not_go_back(self):
+        """Удаление нового комментария не возвращает Last-Modified назад."""
+        url = reverse('posts:api_post_comments', args=[self.post.pk])
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Ещё.'
+        )
+        last_modified = self.client.get(url)['Last-Modified']
+        comment.delete()
+        response = self.client.get(url)
+        self.assertGreaterEqual(
+            parse_http_date(response['Last-Modified']),
+            parse_http_date(last_modified),
+        )
+        self.assertNotIn(
+            'Last-Modified', self.client.get(reverse('posts:api_index'))
+        )
+
+    def test_last_modified(self):
+        """If-Modified-Since со временем изменения поста даёт 304."""
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
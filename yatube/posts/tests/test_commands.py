@@ -0,0 +1,329 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts import search
+from posts.management.commands import _bulk, import_posts
+from posts.models import (
+    Comment, Follow, Group, ImageBlob, Post, TimelineEntry, User, UserStats
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class RebuildUserStatsCommandTests(TestCase):
+    """Тестирование команды rebuild_user_stats."""
+    def test_rebuild_user_stats(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост №{i}') for i in range(3)
+        )
+        Follow.objects.bulk_create([Follow(user=reader, author=author)])
+        out = StringIO()
+        call_command('rebuild_user_stats', batch_size=1, stdout=out)
+        self.assertIn('исправлено: 2', out.getvalue())
+        author_stats = UserStats.objects.get(user=author)
+        self.assertEqual(author_stats.posts_count, 3)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(UserStats.objects.get(user=reader).following_count, 1)
+
+
+class RebuildTimelinesCommandTests(TestCase):
+    """Тестирование команды rebuild_timelines."""
+    def test_rebuild_timelines(self):
+        author = User.objects.create_user(username='author')
+        other = User.objects.create_user(username='other')
+        reader = User.objects.create_user(username='reader')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост №{i}') for i in range(2)
+        )
+        stale = Post.objects.create(author=other, text='Без подписки')
+        Follow.objects.bulk_create([Follow(user=reader, author=author)])
+        call_command('rebuild_user_stats', stdout=StringIO())
+        TimelineEntry.objects.create(user=reader, post=stale)
+        out = StringIO()
+        call_command('rebuild_timelines', stdout=out)
+        self.assertIn('Удалено записей: 1, добавлено: 2.', out.getvalue())
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            {
+                (reader.pk, post_id) for post_id in
+                author.posts.values_list('pk', flat=True)
+            }
+        )
+
+
+class BulkCreateDatedTests(TestCase):
+    """Тестирование bulk_create с заданными датами."""
+    def test_dates_kept_without_touching_fields(self):
+        author = User.objects.create_user(username='author')
+        created = timezone.now() - timedelta(days=30)
+        original = _bulk.DatedQuerySet._insert
+        saved = []
+
+        def insert_and_save(queryset, *args, **kwargs):
+            # Обычное сохранение посреди вставки получает текущую дату.
+            saved.append(Post.objects.create(author=author, text='Новый.'))
+            return original(queryset, *args, **kwargs)
+
+        with mock.patch.object(
+            _bulk.DatedQuerySet, '_insert', insert_and_save
+        ):
+            _bulk.bulk_create_dated(Post, [
+                Post(author=author, text='Старый.', created=created,
+                     updated=created)
+            ])
+        self.assertEqual(Post.objects.get(text='Старый.').created, created)
+        self.assertGreater(saved[0].created, created)
+        self.assertTrue(Post._meta.get_field('created').auto_now_add)
+        self.assertTrue(Post._meta.get_field('updated').auto_now)
+
+
+class BenchmarkFeedsCommandTests(TestCase):
+    """Тестирование команды benchmark_feeds."""
+    def test_benchmark_feeds_reports_and_rolls_back(self):
+        out = StringIO()
+        call_command(
+            'benchmark_feeds', posts=30, users=5, groups=2, repeat=1,
+            deep_page=2, stdout=out
+        )
+        output = out.getvalue()
+        for name in ('index', 'group_posts', 'profile', 'follow_index'):
+            with self.subTest(name=name):
+                self.assertIn(name, output)
+        self.assertIn('post_group_created_idx', output)
+        self.assertIn('2-я страница, курсор: min', output)
+        self.assertFalse(Post.objects.exists())
+
+
+class RebuildSearchIndexCommandTests(TestCase):
+    """Тестирование команды rebuild_search_index."""
+    def test_rebuild_search_index(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост №{i}') for i in range(3)
+        )
+        self.assertEqual(list(search.get_backend().search('пост')), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('проиндексировано документов: 3', out.getvalue())
+        self.assertEqual(len(search.get_backend().search('пост')), 3)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferCommandsTests(TestCase):
+    """Тестирование команд export_posts и import_posts."""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.dump = os.path.join(self.directory, 'dump.ndjson')
+        author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Классика', slug='classic', description='Описание.'
+        )
+        Follow.objects.create(user=reader, author=author)
+        self.created = timezone.now() - timedelta(days=30)
+        for i in range(5):
+            post = Post.objects.create(
+                author=author, group=group, text=f'Глава №{i}'
+            )
+            Comment.objects.create(
+                post=post, author=reader, text=f'Отзыв о главе №{i}'
+            )
+        post.image = SimpleUploadedFile('small.gif', SMALL_GIF)
+        post.save()
+        self.image = post.image.name
+        Post.objects.update(created=self.created)
+
+    def export(self):
+        call_command(
+            'export_posts', self.dump, with_images=True,
+            stdout=StringIO(), stderr=StringIO()
+        )
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        Post.image.field.storage.delete(self.image)
+
+    def assert_imported(self):
+        author = User.objects.get(username='author')
+        self.assertEqual(author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(
+            set(Post.objects.values_list('created', flat=True)),
+            {self.created}
+        )
+        self.assertEqual(
+            Post.objects.filter(group__slug='classic').count(), 5
+        )
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author=author
+        ).exists())
+        self.assertEqual(UserStats.objects.get(user=author).posts_count, 5)
+        self.assertEqual(TimelineEntry.objects.count(), 5)
+        self.assertEqual(len(search.get_backend().search('отзыв')), 5)
+        self.assertTrue(Post.image.field.storage.exists(self.image))
+        self.assertEqual(ImageBlob.objects.get(name=self.image).refcount, 1)
+
+    def test_export_and_import(self):
+        self.export()
+        out = StringIO()
+        call_command('import_posts', self.dump, batch_size=4, stdout=out)
+        self.assertIn('Импорт завершён', out.getvalue())
+        self.assert_imported()
+
+    def test_import_resumes_from_checkpoint(self):
+        self.export()
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        original = import_posts.bulk_create_dated
+        calls = []
+
+        def failing_bulk_create(model, *args, **kwargs):
+            if model is Comment:
+                calls.append(1)
+                if len(calls) == 2:
+                    raise RuntimeError('Сбой посреди импорта')
+            return original(model, *args, **kwargs)
+
+        with mock.patch.object(
+            import_posts, 'bulk_create_dated', failing_bulk_create
+        ):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    'import_posts', self.dump, batch_size=4,
+                    checkpoint=checkpoint, stdout=StringIO()
+                )
+        with open(checkpoint) as stream:
+            self.assertEqual(json.load(stream)['line'], 4)
+        out = StringIO()
+        call_command(
+            'import_posts', self.dump, batch_size=4,
+            checkpoint=checkpoint, stdout=out
+        )
+        self.assertIn('Продолжение со строки 5', out.getvalue())
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assert_imported()
+
+
+class SeedDataCommandTests(TestCase):
+    """Тестирование команды seed_data."""
+    def seed(self):
+        call_command(
+            'seed_data', users=30, groups=3, posts=200, comments=50,
+            follows=5, seed=7, stdout=StringIO()
+        )
+
+    def test_seed_data(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        authors = Post.objects.values('author').annotate(
+            total=Count('pk')
+        ).order_by('-total').values_list('total', flat=True)
+        self.assertGreater(authors[0], 200 / 30 * 3)
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            200
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_seed_is_reproducible(self):
+        self.seed()
+        first = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text'
+        ))
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed()
+        second = list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text'
+        ))
+        self.assertEqual(first, second)
+
+
+class BenchmarkViewsCommandTests(TestCase):
+    """Тестирование команды benchmark_views."""
+    def test_report_and_baseline(self):
+        call_command(
+            'seed_data', users=10, groups=2, posts=30, comments=10,
+            seed=1, stdout=StringIO()
+        )
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        report_path = os.path.join(directory, 'report.json')
+        call_command(
+            'benchmark_views', requests=3, warmup=1, cold=True,
+            output=report_path, stdout=StringIO()
+        )
+        with open(report_path) as stream:
+            report = json.load(stream)
+        self.assertEqual(report['meta']['posts'], 30)
+        for name in (
+            'index', 'index_deep', 'index_deep_page', 'profile',
+            'post_detail', 'follow_index',
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(report['views'][name]['status'], 200)
+                self.assertGreater(report['views'][name]['queries'], 0)
+        report['views']['index']['queries'] = 0
+        with open(report_path, 'w') as stream:
+            json.dump(report, stream)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_views', requests=3, cold=True,
+                baseline=report_path, fail_on_regression=True,
+                stdout=StringIO()
+            )
+
+
+class BenchmarkConcurrencyCommandTests(TestCase):
+    """Тестирование команды benchmark_concurrency."""
+    def test_report(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        report_path = os.path.join(directory, 'report.json')
+        call_command(
+            'benchmark_concurrency', paths=['/about/author/'], requests=4,
+            concurrency=[1, 2], workers=2, output=report_path,
+            stdout=StringIO()
+        )
+        with open(report_path) as stream:
+            report = json.load(stream)
+        self.assertEqual(
+            [(row['mode'], row['concurrency']) for row in report],
+            [('wsgi', 1), ('asgi', 1), ('wsgi', 2), ('asgi', 2)]
+        )
+        for row in report:
+            with self.subTest(mode=row['mode']):
+                self.assertGreater(row['rps'], 0)
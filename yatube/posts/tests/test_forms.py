@@ -1,12 +1,17 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db import transaction
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from posts.models import Comment, Group, Post, User
+from posts.constants import IMAGE_MAX_SIZE
+from posts.models import Comment, Group, ImageBlob, Post, User
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -79,10 +84,138 @@ class FormsTest(TestCase):
                 author=self.author,
                 group=self.group.id,
                 text=form_data['text'],
-                image='posts/small.gif',
+                image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$',
             ).exists()
         )
 
+    def upload_post(self, text, content):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': text,
+                'image': SimpleUploadedFile(
+                    name='photo.png', content=content,
+                    content_type='image/png'
+                ),
+            },
+        )
+        return Post.objects.get(text=text)
+
+    def test_identical_images_are_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'blue').save(buffer, 'PNG')
+        first = self.upload_post('Первая копия.', buffer.getvalue())
+        second = self.upload_post('Вторая копия.', buffer.getvalue())
+        self.assertEqual(first.image.name, second.image.name)
+        blob = ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 2)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        self.assertEqual(
+            ImageBlob.objects.get(name=second.image.name).refcount, 1
+        )
+        with mock.patch.object(
+            transaction, 'on_commit', lambda func: func()
+        ):
+            second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+        self.assertFalse(
+            ImageBlob.objects.filter(name=second.image.name).exists()
+        )
+
+    def test_upload_during_pending_delete_keeps_file(self):
+        """Файл не удаляется, если его загрузили снова до удаления."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'green').save(buffer, 'PNG')
+        first = self.upload_post('Первая копия.', buffer.getvalue())
+        callbacks = []
+        with mock.patch.object(transaction, 'on_commit', callbacks.append):
+            first.delete()
+        self.assertEqual(len(callbacks), 1)
+        second = self.upload_post('Вторая копия.', buffer.getvalue())
+        callbacks[0]()
+        self.assertTrue(second.image.storage.exists(second.image.name))
+        self.assertEqual(
+            ImageBlob.objects.get(name=second.image.name).refcount, 1
+        )
+
+    def test_reupload_on_edit_keeps_refcount(self):
+        """Повторная загрузка того же файла не меняет счётчик ссылок."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'red').save(buffer, 'PNG')
+        post = self.upload_post('Пост с картинкой.', buffer.getvalue())
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={
+                'text': 'Новый текст.',
+                'image': SimpleUploadedFile(
+                    name='photo.png', content=buffer.getvalue(),
+                    content_type='image/png'
+                ),
+            },
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст.')
+        self.assertEqual(
+            ImageBlob.objects.get(name=post.image.name).refcount, 1
+        )
+
+    def test_uploaded_image_is_normalized(self):
+        """Картинка уменьшается, перекодируется и очищается от EXIF."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        Image.new('RGB', (4000, 1000), 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name='big.jpeg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с большой картинкой.', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с большой картинкой.')
+        expected_size = (IMAGE_MAX_SIZE[0], IMAGE_MAX_SIZE[0] // 4)
+        self.assertEqual((post.image_width, post.image_height), expected_size)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, expected_size)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertFalse(image.getexif())
+
+    def test_animated_image_is_normalized(self):
+        """Анимация уменьшается покадрово и теряет метаданные."""
+        frames = [
+            Image.new('RGB', (4000, 1000), color)
+            for color in ('red', 'blue')
+        ]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            duration=200, loop=0, comment=b'secret'
+        )
+        uploaded = SimpleUploadedFile(
+            name='big.gif', content=buffer.getvalue(),
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с анимацией.', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с анимацией.')
+        expected_size = (IMAGE_MAX_SIZE[0], IMAGE_MAX_SIZE[0] // 4)
+        self.assertEqual((post.image_width, post.image_height), expected_size)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'GIF')
+            self.assertEqual(image.size, expected_size)
+            self.assertEqual(image.n_frames, 2)
+            self.assertEqual(image.info['duration'], 200)
+            self.assertNotIn('comment', image.info)
+
     def test_post_edit_form(self):
         """Проверка работы функции при редактировании поста"""
         all_posts = Post.objects.count()
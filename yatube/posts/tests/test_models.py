@@ -1,6 +1,9 @@
+from unittest import mock
+
+from django.db import DatabaseError
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User, UserStats
 from posts.constants import POST_LIMIT
 
 
@@ -53,3 +56,80 @@ class TestModels(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     self.post._meta.get_field(value).help_text, expected)
+
+
+class UserStatsTests(TestCase):
+    """Тестирование денормализованных счётчиков пользователя."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Текст поста.')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий.'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).comments_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        for user in (self.author, self.reader):
+            with self.subTest(user=user):
+                stats = self.get_stats(user)
+                for field in UserStats.COUNTER_FIELDS:
+                    self.assertEqual(getattr(stats, field), 0)
+
+    def test_rebuild_reconciles_bulk_changes(self):
+        """rebuild исправляет счётчики после массовых операций."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост №{i}') for i in range(3)
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        fixed = UserStats.objects.rebuild([self.author.pk, self.reader.pk])
+        self.assertEqual(fixed, 2)
+        self.assertEqual(self.get_stats(self.author).posts_count, 3)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+
+    def test_post_comments_count(self):
+        """comments_count поста следует за комментариями."""
+        post = Post.objects.create(author=self.author, text='Текст поста.')
+        comments = [
+            Comment.objects.create(post=post, author=self.reader, text='Да.')
+            for _ in range(2)
+        ]
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comments[0].delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        Post.objects.rebuild_comments_count()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_for_user_does_not_write(self):
+        """for_user считает счётчики без записи, если её нет."""
+        Post.objects.create(author=self.author, text='Текст поста.')
+        UserStats.objects.filter(user=self.author).delete()
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(UserStats.objects.for_user(author).posts_count, 1)
+        self.assertFalse(UserStats.objects.filter(user=author).exists())
+
+    def test_failed_counter_update_rolls_back_save(self):
+        """Сохранение и изменение счётчиков выполняются вместе."""
+        with mock.patch(
+            'posts.signals.change_stats', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(author=self.author, text='Текст поста.')
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
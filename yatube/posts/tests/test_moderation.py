@@ -0,0 +1,117 @@
+from django.contrib.admin import helpers
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import caching, moderation, search
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserStats
+)
+
+
+class ModerationTests(TestCase):
+    """Тестирование массовых операций модерации."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='test_slug', description='Описание.'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.spammer)
+
+    def setUp(self):
+        self.spam = [
+            Post.objects.create(author=self.spammer, text=f'Спам {i}')
+            for i in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, text='Пост.')
+        Comment.objects.create(
+            post=self.spam[0], author=self.reader, text='Ответ на спам.'
+        )
+        for post in (self.post, self.spam[1]):
+            Comment.objects.create(
+                post=post, author=self.spammer, text='Спам в комментарии.'
+            )
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_move_posts(self):
+        """Посты переносятся в группу одним UPDATE на порцию."""
+        ids = [post.pk for post in self.spam]
+        with self.assertNumQueries(6):
+            moved = moderation.move_posts(ids, self.group, batch_size=2)
+        self.assertEqual(moved, 3)
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(), len(ids)
+        )
+
+    def test_move_posts_bumps_post_versions(self):
+        keys = [caching.version_key(caching.POST, post.pk)
+                for post in self.spam]
+        before = caching.get_versions(*keys)
+        moderation.move_posts([self.spam[0].pk, self.spam[1].pk], self.group)
+        after = caching.get_versions(*keys)
+        self.assertNotEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+        self.assertEqual(after[2], before[2])
+
+    def test_delete_posts_by_authors(self):
+        """Удаление постов автора сохраняет счётчики и индекс."""
+        deleted = moderation.delete_posts_by_authors(
+            [self.spammer.pk], batch_size=2
+        )
+        self.assertEqual(deleted, 3)
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=self.spammer
+        ).exists())
+        self.assertEqual(self.stats(self.spammer).posts_count, 0)
+        self.assertEqual(self.stats(self.spammer).comments_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+        self.assertEqual(
+            list(search.get_backend().search('спам')), [self.post]
+        )
+
+    def test_purge_comments(self):
+        """Удаление комментариев пересчитывает счётчики постов."""
+        deleted = moderation.purge_comments([self.spammer.pk], batch_size=1)
+        self.assertEqual(deleted, 2)
+        self.assertFalse(Comment.objects.filter(author=self.spammer).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.spammer).comments_count, 0)
+        self.assertEqual(list(search.get_backend().search('комментарии')), [])
+
+    def test_admin_actions(self):
+        """Действия админки спрашивают подтверждение и сообщают время."""
+        url = reverse('admin:posts_post_changelist')
+        data = {
+            'action': 'delete_authors_posts',
+            helpers.ACTION_CHECKBOX_NAME: [self.spam[0].pk],
+        }
+        response = self.admin_client.post(url, data)
+        self.assertTemplateUsed(
+            response, 'admin/posts/confirm_moderation.html'
+        )
+        self.assertContains(response, 'spammer')
+        self.assertEqual(Post.objects.filter(author=self.spammer).count(), 3)
+        response = self.admin_client.post(
+            url, {**data, 'post': 'yes'}, follow=True
+        )
+        self.assertContains(response, 'Удалено постов: 3 за')
+        response = self.admin_client.post(url, {
+            'action': 'move_to_group',
+            'group': self.group.pk,
+            helpers.ACTION_CHECKBOX_NAME: [self.post.pk],
+        }, follow=True)
+        self.assertContains(response, 'Перенесено постов: 1 за')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.group, self.group)
@@ -0,0 +1,95 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Group, Post, User
+
+
+class SearchTests(TestCase):
+    """Тестирование полнотекстового поиска."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            description='Описание группы для проверки поиска.',
+            slug='test_slug',
+            title='Тестовая группа для проверки поиска'
+        )
+        cls.in_text = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Рецепт борща со сметаной.'
+        )
+        cls.in_comment = Post.objects.create(
+            author=cls.author, text='Что приготовить на обед?'
+        )
+        Comment.objects.create(
+            author=cls.author, post=cls.in_comment, text='Свари борща!'
+        )
+        Post.objects.create(author=cls.author, text='Пост про котиков.')
+
+    def search(self, query, cursor=None):
+        return list(search.get_backend().search(query, cursor))
+
+    def test_fts_backend_is_used_on_sqlite(self):
+        self.assertIsInstance(search.get_backend(), search.Fts5Backend)
+
+    def test_ranked_search_over_posts_and_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        self.assertEqual(
+            self.search('БОРЩА'), [self.in_text, self.in_comment]
+        )
+        self.assertEqual(self.search('борща сметаной'), [self.in_text])
+        self.assertEqual(self.search('пельмени'), [])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"борща', 'борща OR', 'NEAR(борща', '* - ^'):
+            with self.subTest(query=query):
+                self.search(query)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении постов и комментариев."""
+        post = Post.objects.get(pk=self.in_text.pk)
+        post.text = 'Рецепт щей.'
+        post.save()
+        self.assertEqual(self.search('борща'), [self.in_comment])
+        self.assertEqual(self.search('щей'), [post])
+        self.in_comment.comments.all().delete()
+        self.assertEqual(self.search('борща'), [])
+        post.delete()
+        self.assertEqual(self.search('щей'), [])
+
+    def test_cursor_pagination(self):
+        """Курсор обходит все результаты без повторов в обе стороны."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Каша №{i}')
+            for i in range(7)
+        ]
+        backend = search.get_backend()
+        first = backend.search('каша', per_page=3)
+        second = backend.search('каша', first.next_cursor, per_page=3)
+        third = backend.search('каша', second.next_cursor, per_page=3)
+        found = list(first) + list(second) + list(third)
+        self.assertCountEqual(found, posts)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        back = backend.search('каша', second.previous_cursor, per_page=3)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    @override_settings(SEARCH_BACKEND='posts.search.LikeBackend')
+    def test_like_backend(self):
+        self.assertIsInstance(search.get_backend(), search.LikeBackend)
+        self.assertCountEqual(
+            self.search('борща'), [self.in_text, self.in_comment]
+        )
+
+    def test_search_page(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'борща'})
+        self.assertEqual(response.context['query'], 'борща')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.in_text, self.in_comment]
+        )
+        response = self.client.get(reverse('posts:search'))
+        self.assertIsNone(response.context['page_obj'])
@@ -2,17 +2,21 @@ import math
 import random
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Comment, Group, Post, User, Follow
+from core.perf.queries import query_budget
+from posts.models import Comment, Group, Post, User, Follow, TimelineEntry
 from posts.forms import PostForm, CommentForm
-from posts import constants
+from posts import caching, constants, thumbnails, timeline
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -157,7 +161,7 @@ class URLTests(TestCase):
         form = response.context['form']
         post_comments = Comment.objects.filter(post=self.post.id)
         self.assertIsInstance(form, CommentForm)
-        self.assertQuerysetEqual(response_comments, post_comments)
+        self.assertEqual(list(response_comments), list(post_comments))
         self.check_post_attributes(post)
 
     def test_post_edit_context(self):
@@ -232,12 +236,24 @@ class URLTests(TestCase):
         )
         url = reverse('posts:index')
         response_1 = self.authorized_client.get(url)
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Правка без сигналов.')
         response_2 = self.authorized_client.get(url)
         self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
+        post.delete()
         response_3 = self.authorized_client.get(url)
         self.assertNotEqual(response_3.content, response_1.content)
+        self.assertNotContains(response_3, 'Правка без сигналов.')
+
+    def test_cached_feed_keeps_user_header(self):
+        """Закэшированная лента не подменяет шапку другого пользователя."""
+        other = User.objects.create_user(username='other_reader')
+        other_client = Client()
+        other_client.force_login(other)
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        response = other_client.get(url)
+        self.assertContains(response, 'Пользователь: other_reader')
+        self.assertNotContains(response, 'Пользователь: author')
 
 
 class PaginatorViewsTest(URLTests):
@@ -280,6 +296,84 @@ class PaginatorViewsTest(URLTests):
                             constants.PAGINATOR_LIMIT
                         )
 
+    def test_cursor_paginator(self):
+        """Проход по ленте курсорами вперёд и назад."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Пост №{i+1}')
+            for i in range(constants.PAGINATOR_LIMIT * 2 + 1)
+        )
+        urls = [
+            '/',
+            f'/group/{self.group.slug}/',
+            f'/profile/{self.author}/'
+        ]
+        expected = list(Post.objects.order_by('-created', '-pk'))
+        for url in urls:
+            with self.subTest(url=url):
+                pages = []
+                page_obj = self.client.get(url).context['page_obj']
+                pages.append(page_obj)
+                while page_obj.has_next():
+                    cache.clear()
+                    page_obj = self.client.get(
+                        f'{url}?cursor={page_obj.next_cursor}'
+                    ).context['page_obj']
+                    pages.append(page_obj)
+                self.assertEqual(
+                    [post for page in pages for post in page], expected
+                )
+                for page in reversed(pages[:-1]):
+                    cache.clear()
+                    page_obj = self.client.get(
+                        f'{url}?cursor={page_obj.previous_cursor}'
+                    ).context['page_obj']
+                    self.assertEqual(list(page_obj), list(page))
+                self.assertFalse(page_obj.has_previous())
+
+    def test_cursor_paginator_skips_count(self):
+        """Лента по умолчанию загружается без COUNT(*) и OFFSET."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/')
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_default_page_links_to_cursor(self):
+        """Ссылки пагинатора по умолчанию ведут на курсорные страницы."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост №{i+1}')
+            for i in range(constants.PAGINATOR_LIMIT)
+        )
+        response = self.client.get('/')
+        page_obj = response.context['page_obj']
+        self.assertIsInstance(page_obj, Page)
+        self.assertContains(response, f'?cursor={page_obj.next_cursor}')
+        self.assertNotContains(response, '?page=')
+
+    def test_cursor_page_supports_page_methods(self):
+        """Методы Page на курсорной странице не падают."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост №{i+1}')
+            for i in range(constants.PAGINATOR_LIMIT * 2)
+        )
+        first = self.client.get('/').context['page_obj']
+        second = self.client.get(
+            f'/?cursor={first.next_cursor}'
+        ).context['page_obj']
+        limit = constants.PAGINATOR_LIMIT
+        self.assertEqual((first.start_index(), first.end_index()), (1, limit))
+        self.assertEqual(
+            (second.start_index(), second.end_index()),
+            (limit + 1, limit * 2)
+        )
+        self.assertTrue(second.has_next())
+        self.assertGreater(second.paginator.count, limit * 2)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор возвращает первую страницу."""
+        response = self.client.get('/?cursor=not-a-cursor')
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -361,3 +455,437 @@ class FollowTests(TestCase):
         )
         posts = response.context['page_obj']
         self.assertNotIn(self.post, posts)
+
+    def get_follow_feed(self):
+        response = self.authorized_client_follower.get(
+            reverse('posts:follow_index')
+        )
+        return list(response.context['page_obj'])
+
+    def test_timeline_fan_out_and_prune(self):
+        """Посты раскладываются в ленту при подписке и публикации."""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        new_post = Post.objects.create(
+            author=self.user_author, text='Новый пост после подписки'
+        )
+        entries = TimelineEntry.objects.filter(user=self.user_follower)
+        self.assertEqual(
+            set(entries.values_list('post_id', flat=True)),
+            {self.post.pk, new_post.pk}
+        )
+        self.assertEqual(self.get_follow_feed(), [new_post, self.post])
+        self.authorized_client_follower.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.user_author.username}
+            )
+        )
+        self.assertFalse(entries.exists())
+        self.assertEqual(self.get_follow_feed(), [])
+
+    def test_timeline_pull_for_popular_authors(self):
+        """Посты популярных авторов подмешиваются в ленту при чтении."""
+        with mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 0):
+            Follow.objects.create(
+                user=self.user_follower, author=self.user_author
+            )
+            new_post = Post.objects.create(
+                author=self.user_author, text='Пост популярного автора'
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(user=self.user_follower).exists()
+            )
+            self.assertEqual(self.get_follow_feed(), [new_post, self.post])
+
+    def test_timeline_backfill_when_author_drops_below_limit(self):
+        """После отписки автор снова раскладывает посты по лентам."""
+        with mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 1):
+            Follow.objects.create(
+                user=self.user_follower, author=self.user_author
+            )
+            Follow.objects.create(
+                user=self.user_unfollower, author=self.user_author
+            )
+            entries = TimelineEntry.objects.filter(user=self.user_follower)
+            entries.delete()
+            Follow.objects.get(user=self.user_unfollower).delete()
+            self.assertEqual(
+                list(entries.values_list('post_id', flat=True)),
+                [self.post.pk]
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(
+                    user=self.user_unfollower
+                ).exists()
+            )
+
+
+class QueryCountTests(TestCase):
+    """Проверка количества запросов к БД на страницах с лентой постов."""
+    POSTS_NUM = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            description='Описание группы для проверки запросов.',
+            slug='test_slug',
+            title='Тестовая группа для проверки запросов'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост №{i}')
+            for i in range(cls.POSTS_NUM)
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        cache.clear()
+
+    def test_feed_pages_query_budget(self):
+        """Число запросов не зависит от количества постов на странице."""
+        pages = (
+            (self.client, reverse('posts:index'), 1),
+            (
+                self.client,
+                reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+                2
+            ),
+            (
+                self.client,
+                reverse(
+                    'posts:profile', kwargs={'username': self.author.username}
+                ),
+                2
+            ),
+            (self.follower_client, reverse('posts:follow_index'), 3),
+        )
+        for client, url, budget in pages:
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    client.get(url)
+
+    def test_cached_feed_pages_skip_post_queries(self):
+        """Повторный показ ленты не запрашивает посты из БД."""
+        pages = (
+            (reverse('posts:index'), 0),
+            (
+                reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+                1
+            ),
+            (
+                reverse(
+                    'posts:profile', kwargs={'username': self.author.username}
+                ),
+                1
+            ),
+        )
+        for url, budget in pages:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+
+
+class CommentsPaginationTests(TestCase):
+    """Тестирование постраничного вывода комментариев."""
+    COMMENTS_NUM = constants.COMMENTS_PAGE_LIMIT * 2 + 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост.')
+        commenters = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+        for i in range(cls.COMMENTS_NUM):
+            Comment.objects.create(
+                post=cls.post,
+                author=commenters[i % len(commenters)],
+                text=f'Комментарий №{i}',
+            )
+
+    def test_post_detail_shows_first_page(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            list(comments),
+            list(Comment.objects.order_by('-created', '-pk')[
+                :constants.COMMENTS_PAGE_LIMIT
+            ])
+        )
+        self.assertTrue(comments.has_next())
+        self.assertEqual(
+            response.context['post'].comments_count, self.COMMENTS_NUM
+        )
+
+    def test_post_detail_query_budget(self):
+        """Авторы комментариев загружаются вместе с комментариями."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with query_budget(2):
+            self.client.get(url)
+
+    def test_json_comments_pages(self):
+        """JSON-страницы комментариев по очереди отдают все комментарии."""
+        url = reverse('posts:api_post_comments', args=[self.post.pk])
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertEqual(data['count'], self.COMMENTS_NUM)
+            ids.extend(comment['id'] for comment in data['comments'])
+            url = data['next']
+        self.assertEqual(
+            ids,
+            list(Comment.objects.order_by('-created', '-pk')
+                 .values_list('pk', flat=True))
+        )
+
+    def test_json_comments_unknown_post(self):
+        """Для несуществующего поста возвращается 404."""
+        response = self.client.get(
+            reverse('posts:api_post_comments', args=[self.post.pk + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    """Тестирование условных запросов к страницам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test_slug', description='Описание.'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст поста.'
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified_for_anonymous(self):
+        """Аноним с совпавшим ETag получает 304 без построения страницы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(1 if url != '/' else 0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        """Страницы с датой изменения отвечают на If-Modified-Since."""
+        for url in self.urls[1:]:
+            with self.subTest(url=url):
+                last_modified = self.client.get(url)['Last-Modified']
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Новый пост и комментарий меняют ETag страниц."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий.'
+        )
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост.'
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_authorized_pages_are_private(self):
+        """Авторизованный пользователь всегда получает страницу целиком."""
+        etag = self.client.get(self.urls[0])['ETag']
+        response = self.reader_client.get(
+            self.urls[0], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('ETag', response)
+
+
+class PostCardCacheTests(TestCase):
+    """Тестирование кэширования карточек постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Старое', last_name='Имя'
+        )
+        cls.group = Group.objects.create(
+            description='Описание группы для проверки кэша карточек.',
+            slug='test_slug',
+            title='Тестовая группа для проверки кэша карточек'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Исходный текст.'
+        )
+        self.url = reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        )
+
+    def test_card_is_served_from_cache(self):
+        """Карточка берётся из кэша, пока версия поста не изменилась."""
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка.')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Исходный текст.')
+        self.assertNotContains(response, 'Тихая правка.')
+
+    def test_card_invalidation(self):
+        """Изменение поста, автора или группы обновляет карточку."""
+        self.client.get(self.url)
+        self.post.text = 'Отредактированный текст.'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), self.post.text)
+        self.author.first_name = 'Новое'
+        self.author.save()
+        self.assertContains(self.client.get(self.url), 'Новое Имя')
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        self.assertContains(self.client.get(self.url), self.group.title)
+
+    def test_user_changes_outside_cards_keep_feeds(self):
+        """Регистрация и смена пароля не сбрасывают кэш лент."""
+        scope = caching.index_scope()
+        version = caching.feed_version(scope)
+        User.objects.create_user(username='newcomer')
+        author = User.objects.get(pk=self.author.pk)
+        author.set_password('new-password')
+        author.email = 'author@example.com'
+        author.save()
+        self.assertEqual(caching.feed_version(scope), version)
+        author.last_name = 'Фамилия'
+        author.save()
+        self.assertNotEqual(caching.feed_version(scope), version)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    """Тестирование фоновой генерации миниатюр."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def make_image(self):
+        return SimpleUploadedFile(
+            name='thumb.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'
+            ),
+            content_type='image/gif'
+        )
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Пока миниатюра строится, вместо картинки выводится заглушка."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=self.make_image(),
+        )
+        cache.set(thumbnails.pending_key(post.image.name), True)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertNotContains(response, '<img class="card-img')
+        thumbnails.generate(post.pk)
+        self.assertFalse(cache.get(thumbnails.pending_key(post.image.name)))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img')
+
+    def test_placeholder_keeps_image_size(self):
+        """Заглушка занимает столько же места, сколько картинка."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=self.make_image(),
+            image_width=700,
+            image_height=300,
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        cases = (
+            (constants.THUMBNAIL_OPTIONS, 'aspect-ratio: 960 / 339'),
+            ({'upscale': True}, 'aspect-ratio: 791 / 339'),
+            ({}, 'aspect-ratio: 700 / 300'),
+        )
+        for options, style in cases:
+            with self.subTest(options=options):
+                cache.clear()
+                cache.set(thumbnails.pending_key(post.image.name), True)
+                with mock.patch.object(
+                    thumbnails, 'THUMBNAIL_OPTIONS', options
+                ):
+                    self.assertContains(self.client.get(url), style)
+
+    def test_responsive_image_variants(self):
+        """Картинка выводится со srcset, размерами и ленивой загрузкой."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=self.make_image(),
+            image_width=700,
+            image_height=300,
+        )
+        variants = thumbnails.get_ready_variants(post)
+        self.assertEqual(list(variants), ['thumb', 'mobile', 'desktop'])
+        response = self.client.get(reverse('posts:index'))
+        for name, width in (('thumb', 320), ('mobile', 640), ('desktop', 960)):
+            with self.subTest(variant=name):
+                self.assertContains(
+                    response, f'{variants[name].url} {width}w'
+                )
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertNotContains(response, 'loading="lazy"')
+
+    def test_post_create_schedules_thumbnail(self):
+        """Создание поста с картинкой ставит миниатюру в очередь."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Новый пост', 'image': self.make_image()},
+            )
+        schedule.assert_called_once_with(Post.objects.get(text='Новый пост'))
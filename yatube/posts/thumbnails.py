@@ -0,0 +1,220 @@
+"""
+Фоновая генерация миниатюр изображений постов.
+
+После сохранения поста с новой картинкой все её варианты (IMAGE_VARIANTS)
+строятся в пуле потоков, а шаблоны до их готовности показывают заглушку.
+Если фоновая задача не запущена (например, для старых постов), миниатюры,
+как и раньше, строятся при рендеринге страницы.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import perf
+from core.perf import metrics
+from . import caching
+from .constants import (
+    DEFAULT_IMAGE_VARIANT, IMAGE_VARIANTS, THUMBNAIL_OPTIONS,
+    THUMBNAIL_PENDING_TIMEOUT
+)
+from .models import ImageBlob, Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра из хранилища ключей sorl или None."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = CachedThumbnailBackend()
+
+
+def variant_geometries(post):
+    """
+    Варианты, которые имеет смысл строить для картинки поста.
+
+    Варианты шире исходной картинки пропускаются: увеличенная копия
+    не даёт браузеру ничего нового.
+    """
+    geometries = {}
+    for name, geometry in IMAGE_VARIANTS:
+        width = int(geometry.split('x')[0])
+        if (
+            name == DEFAULT_IMAGE_VARIANT
+            or post.image_width is None
+            or width <= post.image_width
+        ):
+            geometries[name] = geometry
+    return geometries
+
+
+def display_size(post):
+    """
+    Размеры варианта DEFAULT_IMAGE_VARIANT, не строя миниатюру.
+
+    Нужны заглушке, чтобы она занимала место будущей картинки. При
+    кадрировании размер задаёт сам вариант, иначе картинка
+    масштабируется по сохранённым image_width и image_height.
+    """
+    width, height = (
+        int(value) for value in
+        dict(IMAGE_VARIANTS)[DEFAULT_IMAGE_VARIANT].split('x')
+    )
+    if THUMBNAIL_OPTIONS.get('crop') or not (
+        post.image_width and post.image_height
+    ):
+        return width, height
+    scale = min(width / post.image_width, height / post.image_height)
+    if not THUMBNAIL_OPTIONS.get('upscale'):
+        scale = min(scale, 1)
+    return round(post.image_width * scale), round(post.image_height * scale)
+
+
+def pending_key(name):
+    return f'thumbnail_pending:{name}'
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _build(post, geometries):
+    started = time.perf_counter()
+    try:
+        with perf.timed('thumbnail'):
+            for geometry in geometries.values():
+                get_thumbnail(post.image, geometry, **THUMBNAIL_OPTIONS)
+    finally:
+        metrics.THUMBNAIL_DURATION.observe(time.perf_counter() - started)
+
+
+def generate(post_id):
+    """
+    Строит миниатюры поста и сбрасывает кэш карточек.
+
+    Одинаковые картинки хранятся одним файлом, поэтому сбрасываются
+    карточки всех постов, которые на него ссылаются.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    try:
+        _build(post, variant_geometries(post))
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+    finally:
+        cache.delete(pending_key(post.image.name))
+    sharing = Post.objects.filter(image=post.image.name).values_list(
+        'pk', 'author_id', 'group_id'
+    )
+    scopes = {caching.index_scope()}
+    for pk, author_id, group_id in sharing:
+        caching.bump_version(caching.POST, pk)
+        scopes.add(caching.profile_scope(author_id))
+        scopes.add(caching.group_scope(group_id))
+    caching.bump_feeds(*scopes)
+
+
+def _run_in_worker(post_id):
+    try:
+        generate(post_id)
+    finally:
+        connection.close()
+
+
+def _submit(post_id, name):
+    if not cache.add(pending_key(name), True, THUMBNAIL_PENDING_TIMEOUT):
+        # Миниатюры этого файла уже строятся для другого поста.
+        return
+    if settings.THUMBNAIL_WORKERS:
+        get_executor().submit(_run_in_worker, post_id)
+    else:
+        generate(post_id)
+
+
+def schedule(post):
+    """Ставит генерацию миниатюры в очередь после фиксации транзакции."""
+    if not post.image:
+        return
+    name = post.image.name
+    transaction.on_commit(lambda: _submit(post.pk, name))
+
+
+def delete_source(name):
+    """Удаляет исходную картинку вместе со всеми её миниатюрами."""
+    default.backend.delete(ImageFile(name, Post.image.field.storage))
+
+
+def delete_unreferenced(name):
+    """
+    Удаляет картинку, если на неё так и не появилось новых ссылок.
+
+    Вызывается после коммита транзакции, снявшей последнюю ссылку.
+    Запись ImageBlob и файл удаляются в одной транзакции: загрузка того
+    же файла ждёт её завершения и сохраняет файл заново.
+    """
+    with transaction.atomic():
+        if ImageBlob.objects.filter(name=name, refcount=0).delete()[0]:
+            delete_source(name)
+
+
+def _cached_variants(post, geometries):
+    variants = {}
+    for name, geometry in geometries.items():
+        thumbnail = backend.get_cached_thumbnail(
+            post.image, geometry, **THUMBNAIL_OPTIONS
+        )
+        if thumbnail:
+            variants[name] = thumbnail
+    return variants
+
+
+def get_ready_variants(post):
+    """
+    Готовые варианты картинки поста: словарь имя варианта — миниатюра.
+
+    Пустой словарь означает, что картинки нет или миниатюры ещё строятся
+    в фоне.
+    """
+    if not post.image:
+        return {}
+    try:
+        geometries = variant_geometries(post)
+        variants = _cached_variants(post, geometries)
+        if variants or cache.get(pending_key(post.image.name)):
+            return variants
+        _build(post, geometries)
+        # В хранилище ключей попадают только успешно построенные миниатюры.
+        return _cached_variants(post, geometries)
+    except Exception:
+        logger.exception('Не удалось получить миниатюры %s', post.image.name)
+        return {}
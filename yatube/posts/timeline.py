@@ -0,0 +1,131 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в ленты подписчиков автора при публикации.
+Посты авторов, у которых больше FANOUT_FOLLOWERS_LIMIT подписчиков,
+не раскладываются и подмешиваются в ленту при чтении (fan-out on read).
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .constants import FANOUT_BATCH_SIZE, FANOUT_FOLLOWERS_LIMIT
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def is_fan_out_author(author_id):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    return not UserStats.objects.filter(
+        pk=author_id, followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).exists()
+
+
+def _insert_entries(pairs):
+    batch = []
+    for user_id, post_id in pairs:
+        batch.append(TimelineEntry(user_id=user_id, post_id=post_id))
+        if len(batch) == FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if not is_fan_out_author(post.author_id):
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    _insert_entries((user_id, post.pk) for user_id in follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя все посты автора."""
+    if not is_fan_out_author(author_id):
+        return
+    post_ids = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    _insert_entries((user_id, post_id) for post_id in post_ids)
+
+
+def _insert_select(condition, params):
+    """
+    INSERT ... SELECT пар (подписчик, пост автора) из подписок,
+    отобранных условием condition; возвращает число добавленных записей.
+    """
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{TimelineEntry._meta.db_table} (user_id, post_id) '
+        f'SELECT f.user_id, p.id FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        f'LEFT JOIN {UserStats._meta.db_table} s '
+        f'ON s.user_id = f.author_id '
+        f'WHERE {condition} '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def backfill_author(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    return _insert_select('f.author_id = %s', [author_id])
+
+
+def backfill_all():
+    """
+    Раскладывает посты всех авторов по лентам всех подписчиков.
+
+    Выполняется одним запросом INSERT ... SELECT, без выборки пар
+    в Python; нужен для массовой загрузки данных.
+    """
+    return _insert_select(
+        's.followers_count IS NULL OR s.followers_count <= %s',
+        [FANOUT_FOLLOWERS_LIMIT],
+    )
+
+
+def prune_stale():
+    """
+    Удаляет записи лент, которых не было бы после backfill_all: посты
+    авторов без подписки и авторов, чьи посты подмешиваются при чтении.
+    """
+    sql = (
+        f'DELETE FROM {TimelineEntry._meta.db_table} WHERE id IN ('
+        f'SELECT e.id FROM {TimelineEntry._meta.db_table} e '
+        f'JOIN {Post._meta.db_table} p ON p.id = e.post_id '
+        f'LEFT JOIN {Follow._meta.db_table} f '
+        f'ON f.user_id = e.user_id AND f.author_id = p.author_id '
+        f'LEFT JOIN {UserStats._meta.db_table} s '
+        f'ON s.user_id = p.author_id '
+        f'WHERE f.id IS NULL OR s.followers_count > %s)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [FANOUT_FOLLOWERS_LIMIT])
+        return cursor.rowcount
+
+
+def prune(user_id, author_id):
+    """Удаляет посты автора из ленты пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def feed_for(user):
+    """Лента подписок: материализованные записи и посты крупных авторов."""
+    condition = Q(pk__in=TimelineEntry.objects.filter(
+        user=user
+    ).values('post_id'))
+    pull_author_ids = Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).values('author_id')
+    condition |= Q(author_id__in=pull_author_ids)
+    return Post.objects.feed().filter(condition)
@@ -1,10 +1,253 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import functools
+from calendar import timegm
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.http import http_date, quote_etag
 
 from .constants import PAGINATOR_LIMIT
 
+CURSOR_PARAM = 'cursor'
+PAGE_PARAM = 'page'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(obj, direction):
+    """Упаковывает позицию (created, id) в непрозрачный токен."""
+    raw = f'{direction}|{obj.created.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для некорректного токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, created, pk = raw.decode().split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or created is None:
+        return None
+    return direction, created, pk
+
+
+class CursorWindow(Paginator):
+    """
+    Пагинатор одной страницы keyset-пагинации.
+
+    Полного числа строк курсор не знает, поэтому count и num_pages
+    описывают окно вокруг страницы: предыдущую страницу, если она есть,
+    текущую и одну строку следующей. Этого хватает всем методам Page.
+    """
+
+    def __init__(self, object_list, per_page, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, per_page)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @cached_property
+    def count(self):
+        return (
+            self.per_page * (self.previous_cursor is not None)
+            + len(self.object_list)
+            + (self.next_cursor is not None)
+        )
+
+
+def cursor_page(object_list, per_page, next_cursor=None,
+                previous_cursor=None):
+    """Страница с атрибутами next_cursor и previous_cursor."""
+    paginator = CursorWindow(
+        object_list, per_page, next_cursor, previous_cursor
+    )
+    number = 2 if previous_cursor is not None else 1
+    page = Page(object_list, number, paginator)
+    page.cursor_mode = True
+    page.next_cursor = next_cursor
+    page.previous_cursor = previous_cursor
+    return page
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по паре (created, id).
+
+    В отличие от Paginator не выполняет COUNT(*) и не использует OFFSET,
+    поэтому стоимость страницы не зависит от её глубины. Страницы — обычные
+    Page, см. cursor_page.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def get_page(self, token):
+        position = decode_cursor(token)
+        if position is None:
+            return self._page_after(None)
+        direction, created, pk = position
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before(created, pk)
+        return self._page_after((created, pk))
+
+    def rows_after(self, position):
+        """
+        Запрос строк страницы после позиции (created, id).
+
+        Строк на одну больше per_page: лишняя показывает, есть ли
+        следующая страница.
+        """
+        queryset = self.object_list.order_by('-created', '-pk')
+        if position is not None:
+            created, pk = position
+            # created__lte дублирует условие, но без OR: по нему SQLite
+            # начинает чтение индекса сразу с позиции курсора.
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk),
+                created__lte=created,
+            )
+        return queryset[:self.per_page + 1]
+
+    def _page_after(self, position):
+        objects = list(self.rows_after(position))
+        has_next = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        return cursor_page(
+            objects,
+            self.per_page,
+            next_cursor=(
+                encode_cursor(objects[-1], CURSOR_NEXT) if has_next else None
+            ),
+            previous_cursor=(
+                encode_cursor(objects[0], CURSOR_PREVIOUS)
+                if position is not None and objects else None
+            ),
+        )
+
+    def _page_before(self, created, pk):
+        queryset = self.object_list.order_by('created', 'pk').filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk),
+            created__gte=created,
+        )
+        objects = list(queryset[:self.per_page + 1])
+        has_previous = len(objects) > self.per_page
+        objects = objects[:self.per_page][::-1]
+        if not objects:
+            return self._page_after(None)
+        return cursor_page(
+            objects,
+            self.per_page,
+            next_cursor=encode_cursor(objects[-1], CURSOR_NEXT),
+            previous_cursor=(
+                encode_cursor(objects[0], CURSOR_PREVIOUS)
+                if has_previous else None
+            ),
+        )
+
+
+def paginator_func(request, object_list, lazy=False):
+    """
+    Возвращает страницу ленты.
+
+    По умолчанию используется keyset-пагинация по параметру ?cursor=;
+    постраничный вывод по номеру остаётся только для явного ?page=,
+    он считает строки и использует OFFSET. С lazy=True запросы
+    к БД откладываются до первого обращения к странице: если фрагмент
+    с лентой взят из кэша, они не выполняются вовсе.
+    """
+    if lazy:
+        return SimpleLazyObject(
+            lambda: paginator_func(request, object_list)
+        )
+    if PAGE_PARAM in request.GET:
+        paginator = Paginator(object_list, PAGINATOR_LIMIT)
+        return paginator.get_page(request.GET.get(PAGE_PARAM))
+    paginator = CursorPaginator(object_list, PAGINATOR_LIMIT)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+def conditional_response(request, etag, last_modified, build):
+    """
+    Ответ на условный запрос с заголовками ETag и Last-Modified.
+
+    last_modified — функция, возвращающая время последнего изменения,
+    или None; функция не вызывается, если клиент прислал If-None-Match.
+    build строит ответ только тогда, когда 304 отдать нельзя.
+    """
+    etag = quote_etag(etag)
+    modified = None
+    if last_modified is not None and 'HTTP_IF_NONE_MATCH' not in request.META:
+        value = last_modified()
+        modified = timegm(value.utctimetuple()) if value else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=modified
+    )
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def per_request(request, key, factory):
+    """
+    Значение, вычисляемое не больше одного раза за запрос.
+
+    Позволяет валидаторам anonymous_conditional и view загружать
+    объект страницы одним запросом к БД.
+    """
+    values = request.__dict__.setdefault('_per_request', {})
+    if key not in values:
+        values[key] = factory()
+    return values[key]
+
+
+def anonymous_conditional(validators):
+    """
+    Декоратор страниц, которые анонимы получают с условными заголовками.
 
-def paginator_func(request, object_list):
-    paginator = Paginator(object_list, PAGINATOR_LIMIT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    validators(request, *args, **kwargs) возвращает пару (etag,
+    last_modified) для conditional_response. Он должен быть дешёвым:
+    при совпадении ETag страница не строится.
+    Страницы авторизованных пользователей отличаются шапкой и формами,
+    поэтому всегда строятся заново и не кэшируются посредниками.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            anonymous = (
+                request.method in ('GET', 'HEAD')
+                and not request.user.is_authenticated
+            )
+            if not anonymous:
+                response = view(request, *args, **kwargs)
+            else:
+                etag, last_modified = validators(request, *args, **kwargs)
+                response = conditional_response(
+                    request,
+                    f'{etag}:{request.GET.urlencode()}',
+                    last_modified,
+                    lambda: view(request, *args, **kwargs),
+                )
+            patch_cache_control(
+                response,
+                no_cache=True,
+                **{'public' if anonymous else 'private': True}
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -1,40 +1,107 @@
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
 
-from .utils import paginator_func
-from .models import Post, Group, User, Follow
+from . import caching, search, thumbnails, timeline
+from .constants import COMMENTS_PAGE_LIMIT, FEED_CACHE_TIMEOUT
+from .utils import (
+    CURSOR_PARAM, CursorPaginator, anonymous_conditional, paginator_func,
+    per_request
+)
+from .models import Comment, Post, Group, User, Follow, UserStats
 from .forms import PostForm, CommentForm
 
 
-@cache_page(20, key_prefix='index_page')
+def get_group(request, slug):
+    return per_request(
+        request, 'group', lambda: get_object_or_404(Group, slug=slug)
+    )
+
+
+def get_author(request, username):
+    return per_request(request, 'author', lambda: get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    ))
+
+
+def get_post(request, post_id):
+    return per_request(request, 'post', lambda: get_object_or_404(
+        Post.objects.feed().select_related('author__stats'), id=post_id
+    ))
+
+
+def index_validators(request):
+    return caching.feed_version(caching.index_scope()), None
+
+
+def group_validators(request, slug):
+    group = get_group(request, slug)
+    return (
+        caching.feed_version(caching.group_scope(group.pk)),
+        lambda: group.modified,
+    )
+
+
+def profile_validators(request, username):
+    """На странице профиля есть счётчики, они меняют stats.modified."""
+    author = get_author(request, username)
+    modified = UserStats.objects.for_user(author).modified
+    return (
+        f'{caching.feed_version(caching.profile_scope(author.pk))}:'
+        f'{modified.isoformat()}',
+        lambda: modified,
+    )
+
+
+def post_validators(request, post_id):
+    """Страница поста зависит от поста, группы и счётчиков автора."""
+    post = get_post(request, post_id)
+    dates = [post.updated, UserStats.objects.for_user(post.author).modified]
+    if post.group is not None:
+        dates.append(post.group.modified)
+    modified = max(dates)
+    versions = caching.get_versions(
+        caching.version_key(caching.POST, post.pk),
+        caching.version_key(caching.USER, post.author_id),
+        caching.version_key(caching.GROUP, post.group_id),
+    )
+    etag = '.'.join(str(v) for v in versions) + f':{modified.isoformat()}'
+    return etag, lambda: modified
+
+
+@anonymous_conditional(index_validators)
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = paginator_func(request, post_list)
+    post_list = Post.objects.feed()
+    page_obj = paginator_func(request, post_list, lazy=True)
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'feed_version': caching.feed_version(caching.index_scope()),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@anonymous_conditional(group_validators)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_func(request, posts)
+    group = get_group(request, slug)
+    posts = group.posts.feed()
+    page_obj = paginator_func(request, posts, lazy=True)
     template = 'posts/group_list.html'
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_version': caching.feed_version(caching.group_scope(group.pk)),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@anonymous_conditional(profile_validators)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_func(request, posts)
+    author = get_author(request, username)
+    posts = author.posts.feed()
+    page_obj = paginator_func(request, posts, lazy=True)
     template = 'posts/profile.html'
     following = False
     if request.user.is_authenticated:
@@ -46,23 +113,37 @@ def profile(request, username):
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'stats': UserStats.objects.for_user(author),
+        'feed_version': caching.feed_version(
+            caching.profile_scope(author.pk)
+        ),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@anonymous_conditional(post_validators)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comments_page(request, post.pk)
     template = 'posts/post_detail.html'
     context = {
         'comments': comments,
         'form': form,
         'post': post,
+        'stats': UserStats.objects.for_user(post.author),
     }
     return render(request, template, context)
 
 
+def comments_page(request, post_id):
+    """Страница комментариев поста по курсору, вместе с авторами."""
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(comments, COMMENTS_PAGE_LIMIT)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -70,6 +151,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -86,6 +168,8 @@ def post_edit(request, post_id):
     if request.user == post.author:
         if form.is_valid():
             form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
             return redirect('posts:post_detail', post_id=post_id)
         context = {
             'is_edit': is_edit,
@@ -108,9 +192,24 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search.get_backend().search(
+            query, request.GET.get('cursor')
+        )
+    template = 'posts/search.html'
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = timeline.feed_for(request.user)
     page_obj = paginator_func(request, posts)
     template = 'posts/follow.html'
     context = {
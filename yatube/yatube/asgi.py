@@ -0,0 +1,21 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no native ASGI support, so the WSGI application is served
+through a thread pool adapter (see core.asgi). The pool size is set by the
+YATUBE_ASGI_WORKERS environment variable.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(
+    get_wsgi_application(),
+    max_workers=int(os.environ.get('YATUBE_ASGI_WORKERS', 8)),
+)
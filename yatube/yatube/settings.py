@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.perf.middleware.PerformanceMiddleware',
+    'core.perf.queries.QueryInspectorMiddleware',
+    'core.db.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,13 +62,28 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Доля запросов, для которых PerformanceMiddleware собирает замеры
+# (заголовок Server-Timing и метрики /metrics); 0 — замеры выключены.
+PERF_SAMPLE_RATE = float(os.environ.get('YATUBE_PERF_SAMPLE_RATE', 0))
+
+# Журнал запросов к БД для разработки: повторяющиеся запросы и запросы
+# медленнее SLOW_QUERY_MS пишутся в лог core.perf.queries.
+QUERY_INSPECTOR = os.environ.get('YATUBE_QUERY_INSPECTOR') == '1'
+SLOW_QUERY_MS = float(os.environ.get('YATUBE_SLOW_QUERY_MS', 100))
+DUPLICATE_QUERY_THRESHOLD = 2
+
+# Страница /metrics доступна сотрудникам (is_staff) и сборщику метрик
+# с заголовком Authorization: Bearer <METRICS_TOKEN>; пустой токен
+# отключает доступ по заголовку.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.perf.templates.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATE_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,13 +104,54 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединения живут CONN_MAX_AGE секунд; timeout — сколько секунд запрос
+# ждёт блокировку записи, прежде чем вернуть «database is locked».
+SQLITE_OPTIONS = {
+    'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+    'OPTIONS': {
+        'timeout': float(os.environ.get('YATUBE_DB_BUSY_TIMEOUT', 20)),
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **SQLITE_OPTIONS,
     }
 }
 
+# Прагмы каждого нового соединения SQLite (core.db.sqlite). В режиме WAL
+# чтения не ждут записи, а synchronous=NORMAL в нём не теряет
+# целостность и не делает fsync на каждый коммит.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ: 64 МиБ.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики для чтения: YATUBE_DB_REPLICAS — пути к файлам SQLite через
+# запятую. Локально файлы реплик обновляются командой sync_replicas.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name.strip(),
+        'TEST': {'MIRROR': 'default'},
+        **SQLITE_OPTIONS,
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.replicas.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной БД.
+REPLICA_PIN_SECONDS = int(os.environ.get('YATUBE_REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,8 +208,40 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий кэш выбирается переменными окружения:
+# YATUBE_CACHE_BACKEND — locmem или redis,
+# YATUBE_CACHE_LOCATION — адрес сервера, например 127.0.0.1:6379.
+# Для разработки без Redis: python -m core.cache.fake_server
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'redis': 'core.cache.redis.RedisCache',
+}
+
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE_BACKEND', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            # Локальный кэш поверх LocMemCache ничего не даёт.
+            'L1_TIMEOUT': 0 if CACHE_BACKEND == 'locmem' else 5,
+            'L1_KEY_PREFIXES': ('post_card:', 'template.cache.'),
+        },
+    },
+    'shared': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', ''),
+    },
 }
+
+# Потоки фоновой генерации миниатюр; 0 — генерировать синхронно.
+# Тесты всегда строят миниатюры синхронно (core.runner.TestRunner).
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+TEST_RUNNER = 'core.runner.TestRunner'
+
+# Бэкенд поиска; без FTS5 используется posts.search.LikeBackend.
+SEARCH_BACKEND = os.environ.get(
+    'YATUBE_SEARCH_BACKEND', 'posts.search.Fts5Backend'
+)